@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks, run from the project root, e.g.
+    python -m bench.replay .data/recordings/<recording>.jsonl
+
+@author Kami-Kaze
+"""
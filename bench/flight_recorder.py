@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+Records a simulated multi hour session with the FlightRecorder and reports the cost
+per sample on the status thread, the size on disk and how long queries take
+
+usage: python -m bench.flight_recorder [--hours 4] [--rate 4]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from lib import fake_win
+
+# lib.globals pulls in lib.win, not needed here
+fake_win.install()
+
+from lib.flight_recorder import Flight, FlightRecorder  # noqa: E402
+from lib.status import StatusRecord  # noqa: E402
+
+BODIES = ['Synuefe XR-H d11-102 1 b', 'Synuefe XR-H d11-102 2 a', 'HIP 36601 C 3 b', 'Outotz LS-K d8-3 5 a']
+HAS_LAT_LONG = 1 << 21
+
+
+def session(hours: float, rate: float, seed: int = 0):
+    """
+    @return: (t, status) at rate updates per second, hopping between bodies every half hour or so
+    """
+    rng = random.Random(seed)
+    t = time.time()
+    end = t + hours * 3600
+    body, lat, lon, heading = rng.choice(BODIES), rng.uniform(-60, 60), rng.uniform(-180, 180), 0
+    while t < end:
+        if rng.random() < 1 / (1800 * rate):
+            body, lat, lon = rng.choice(BODIES), rng.uniform(-60, 60), rng.uniform(-180, 180)
+        heading = (heading + rng.randint(-3, 3)) % 360
+        lat += rng.uniform(-1e-5, 1e-5)
+        lon += rng.uniform(-1e-5, 1e-5)
+        yield t, StatusRecord(HAS_LAT_LONG | 8, round(lat, 6), round(lon, 6), heading, rng.uniform(0, 50), 1716214.375, body)
+        t += rng.uniform(.5, 1.5) / rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flight recorder benchmark')
+    parser.add_argument('--hours', type=float, default=4.0)
+    parser.add_argument('--rate', type=float, default=4.0, help='status updates per second')
+    args = parser.parse_args()
+
+    samples = list(session(args.hours, args.rate))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'flight')
+        recorder = FlightRecorder(path)
+
+        worst = 0.0
+        t0 = time.perf_counter()
+        for t, status in samples:
+            t1 = time.perf_counter()
+            recorder.record(t, status)
+            worst = max(worst, time.perf_counter() - t1)
+        total = time.perf_counter() - t0
+        recorder.close()
+
+        size = sum(os.path.getsize(os.path.join(path, file)) for file in os.listdir(path))
+        print(f'{args.hours:.1f}h at {args.rate:.0f} updates/s: {len(samples)} samples, {size / 2 ** 20:.2f}MB on disk '
+              f'({size / len(samples):.0f} bytes/sample)')
+        print(f'record: {total / len(samples) * 1e6:.2f}us per sample (worst {worst * 1e3:.2f}ms, flushing a chunk), '
+              f'{total * 1e3:.0f}ms in total')
+
+        t0 = time.perf_counter()
+        flight = Flight(path)
+        t1 = time.perf_counter()
+        start = samples[0][0]
+        hour = flight.query(start + 3600, start + 7200)
+        t2 = time.perf_counter()
+        body = flight.query(body=BODIES[0])
+        t3 = time.perf_counter()
+        both = flight.query(start + 3600, start + 7200, BODIES[0])
+        t4 = time.perf_counter()
+
+        assert len(flight) == len(samples)
+        print(f'open {(t1 - t0) * 1e3:.2f}ms | second hour: {len(hour["t"])} samples in {(t2 - t1) * 1e3:.2f}ms | '
+              f'{BODIES[0]}: {len(body["t"])} in {(t3 - t2) * 1e3:.2f}ms | both: {len(both["t"])} in {(t4 - t3) * 1e3:.2f}ms')
+        del flight, hour, body, both
+
+
+if __name__ == '__main__':
+    main()
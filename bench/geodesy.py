@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""
+Measures distance, bearing and ETA to every waypoint of a planet, batched
+(WaypointMeter) against calling calculate_distance/calculate_bearing per waypoint
+
+usage: python -m bench.geodesy [--waypoints 100000] [--interval .25]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import random
+import timeit
+
+from lib.repository import WaypointRepository
+from lib.waypoint import Waypoint, WaypointMeter, calculate_bearing, calculate_distance
+
+PLANET = 'Synuefe XR-H d11-102 1 b'
+PLANET_RADIUS = 1716214.375
+POSITION = -12.345678, 123.456789
+VELOCITY = 120.0
+
+
+def scalar(waypoints: list[Waypoint]):
+    for waypoint in waypoints:
+        distance = calculate_distance(POSITION, waypoint.position, PLANET_RADIUS)
+        calculate_bearing(POSITION, waypoint)
+        _ = distance / VELOCITY
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batched geodesy micro-benchmark')
+    parser.add_argument('--waypoints', type=int, default=100_000, help='waypoints on the planet')
+    parser.add_argument('--interval', type=float, default=.25, help='time between status updates to compare against (s)')
+    parser.add_argument('--number', type=int, default=5, help='runs per measurement')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    waypoints = [Waypoint.from_position(f'Waypoint {i}', PLANET, rng.uniform(-90, 90), rng.uniform(-180, 180)) for i in range(args.waypoints)]
+    meter = WaypointMeter(WaypointRepository(waypoints))
+
+    def measure():
+        meter.measure(PLANET, POSITION, PLANET_RADIUS, VELOCITY)
+
+    def rebuild():
+        meter.invalidate()
+        measure()
+
+    # the first measurement builds the coordinate arrays
+    measure()
+
+    print(f'{args.waypoints} waypoints, status interval {args.interval * 1e3:.0f}ms')
+    for label, fn in (('scalar', lambda: scalar(waypoints)), ('batched', measure), ('batched + rebuild', rebuild)):
+        t = min(timeit.repeat(fn, number=args.number, repeat=3)) / args.number
+        print(f'{label:>18} | {t * 1e3:8.2f}ms ({t / args.interval:.1%} of the interval)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+"""
+Throughput and ordering of the InputDispatcher against the fake backend
+
+usage: python -m bench.input_dispatch [--presses 10000] [--spacing 0.0]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import time
+
+from lib import fake_win
+
+# must happen before anything imports lib.win
+fake_win.install()
+
+from lib.input import InputDispatcher  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='InputDispatcher throughput and ordering')
+    parser.add_argument('--presses', type=int, default=10_000, help='number of presses to queue')
+    parser.add_argument('--spacing', type=float, default=0.0, help='min spacing between SendInput calls (s)')
+    args = parser.parse_args()
+
+    fake_win.reset()
+    dispatcher = InputDispatcher(args.spacing)
+    dispatcher.start()
+
+    # a handful of bindings, like the automation uses
+    bindings = [(0x3F + i % 5, (0x36,)) for i in range(args.presses)]
+
+    start = time.perf_counter()
+    for key, mods in bindings:
+        dispatcher.press(key, *mods)
+    queued = time.perf_counter() - start
+    dispatcher.wait_idle()
+    sent = time.perf_counter() - start
+    dispatcher.stop()
+
+    in_order = [(key, mods) for _, key, mods in fake_win.presses] == bindings
+    print(f'queued {args.presses} presses in {queued * 1e3:.1f}ms ({queued / args.presses * 1e6:.2f}us per press)')
+    print(f'sent in {sent * 1e3:.1f}ms ({args.presses / sent:.0f} presses/s) using {dispatcher.batches} SendInput calls')
+    print(f'order preserved: {in_order}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+"""
+Overhead of the timing instrumentation (lib.metrics.timed) per call, compared with
+how long the instrumented paths take themselves
+
+usage: python -m bench.instrumentation [--number 1000000]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import timeit
+
+from lib.metrics import RingHistogram, timed
+
+
+def noop():
+    pass
+
+
+@timed('bench')
+def timed_noop():
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Timing instrumentation overhead')
+    parser.add_argument('--number', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    plain = min(timeit.repeat(noop, number=args.number, repeat=5)) / args.number
+    instrumented = min(timeit.repeat(timed_noop, number=args.number, repeat=5)) / args.number
+    histogram = RingHistogram()
+    record = min(timeit.repeat(lambda: histogram.record(.001), number=args.number, repeat=5)) / args.number
+
+    print(f'plain call        {plain * 1e9:7.0f}ns')
+    print(f'timed call        {instrumented * 1e9:7.0f}ns (+{(instrumented - plain) * 1e9:.0f}ns)')
+    print(f'RingHistogram.record {record * 1e9:4.0f}ns')
+    print(f'at 60 frames and ~10 status updates per second that is {(instrumented - plain) * 70 * 1e6:.1f}us per second')
+
+
+if __name__ == '__main__':
+    main()
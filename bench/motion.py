@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+Checks the MotionModel against a simulated drive, or a recording (see lib.replay)
+
+The simulated SRV speeds up, slows down and turns while status updates come in at
+random intervals. At every frame (60 fps) the predicted position is compared to the
+true one, against just showing the last status update as the app did before.
+
+usage: python -m bench.motion [--seconds 600] [--recording .data/recordings/<recording>.jsonl]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import random
+
+from lib.metrics import Histogram
+from lib.motion import DistanceHistogram, MotionModel
+from lib.replay import load_recording
+from lib.status import decode_status
+from lib.waypoint import calculate_destination, calculate_distance
+
+PLANET_RADIUS = 1716214.375
+FRAME_TIME = 1 / 60
+
+
+def simulate(seconds: float, seed: int = 0):
+    """
+    @return: (t, position, heading, altitude) every 10ms of a drive
+    """
+    rng = random.Random(seed)
+    dt = .01
+    position, heading, speed, altitude = (-12.345678, 123.456789), 0.0, 0.0, 0.0
+    target_speed, turn_rate = 30.0, 0.0
+    t = 0.0
+    while t < seconds:
+        if rng.random() < dt / 4:
+            target_speed = rng.choice((0.0, 10.0, 25.0, 40.0))
+        if rng.random() < dt / 2:
+            turn_rate = rng.choice((0.0, 0.0, -30.0, 30.0, -10.0, 10.0))
+
+        # accelerate/brake at up to 8 m/s²
+        speed += max(min(target_speed - speed, 8 * dt), -8 * dt)
+        heading = (heading + turn_rate * dt) % 360
+        position = calculate_destination(position, heading, speed * dt, PLANET_RADIUS)
+        altitude = max(altitude + rng.uniform(-.05, .05), 0.0)
+        yield t, position, heading, altitude
+        t += dt
+
+
+def rounded(position: tuple[float, float]) -> tuple[float, float]:
+    # the game writes 6 decimals
+    return round(position[0], 6), round(position[1], 6)
+
+
+def bench_simulation(seconds: float, seed: int):
+    rng = random.Random(seed)
+    model = MotionModel()
+    frame, hold = DistanceHistogram(), DistanceHistogram()
+
+    next_update = 0.0
+    next_frame = 0.0
+    last = None
+    for t, position, heading, altitude in simulate(seconds, seed):
+        if next_update <= t:
+            sample = rounded(position)
+            model.update(t, sample, round(heading), altitude, PLANET_RADIUS)
+            last = t, sample
+            next_update = t + rng.uniform(.2, .6)
+
+        if next_frame <= t and last is not None:
+            predicted = model.predict(t)
+            frame.record(calculate_distance(predicted.position, position, PLANET_RADIUS))
+            hold.record(calculate_distance(last[1], position, PLANET_RADIUS))
+            next_frame += FRAME_TIME
+
+    print(f'simulated {seconds:.0f}s drive, {model.error.count} status updates, {frame.count} frames')
+    report('at every frame', frame, hold)
+    report('at the next update', model.error, model.hold_error)
+
+
+def bench_recording(path: str):
+    model = MotionModel()
+    for t, payload in load_recording(path):
+        status = decode_status(payload)
+        if status.has_position:
+            model.update(t, status.position, status.heading, status.altitude, status.planet_radius)
+        else:
+            model.clear()
+
+    print(f'{path}: {model.error.count} status updates')
+    report('at the next update', model.error, model.hold_error)
+
+
+def report(title: str, predicted: Histogram, hold: Histogram):
+    def line(h: Histogram) -> str:
+        return f'p50 {h.percentile(.5):>7.2f}m | p95 {h.percentile(.95):>7.2f}m | mean {h.mean:>7.2f}m | max {h.max:>7.2f}m'
+
+    print(f'  error {title}:')
+    print(f'    predicted  {line(predicted)}')
+    print(f'    last value {line(hold)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Motion model prediction error')
+    parser.add_argument('--seconds', type=float, default=600, help='length of the simulated drive (s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--recording', help='use a recording instead of the simulation')
+    args = parser.parse_args()
+
+    if args.recording:
+        bench_recording(args.recording)
+    else:
+        bench_simulation(args.seconds, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""
+Runs a stand-in render loop (60 fps vsync) through the FramePacer and reports the
+frame rate while active, idle and hidden, and how fast it wakes up again
+
+The window's event wait is replaced by a threading.Event, wake sets it just like
+glfw.post_empty_event makes glfw.wait_events_timeout return. Like the app's main loop,
+the stand-in dispatches queued events (e.g. the tray's show) itself between frames, so
+being shown again from there only works if wait_frame returns while hidden. Like MyApp,
+it calls render after every update, which only builds the ui while not hidden.
+
+usage: python -m bench.pacing [--phase 3]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import threading
+import time
+
+from lib.pacing import FramePacer
+
+VSYNC = 1 / 60
+
+
+class Events:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def wait(self, timeout: float):
+        self._event.wait(timeout)
+        self._event.clear()
+
+    def wake(self):
+        self._event.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Frame pacing benchmark')
+    parser.add_argument('--phase', type=float, default=3.0, help='length of each phase (s)')
+    args = parser.parse_args()
+
+    events = Events()
+    pacer = FramePacer(events.wait, events.wake)
+    frames: list[float] = []
+    # events dispatched by the loop itself
+    queued = []
+    turns = 0
+    running = True
+
+    def loop():
+        nonlocal turns
+        while running:
+            turns += 1
+            while queued:
+                queued.pop(0)()
+            # MyApp.update, the loop renders whatever it returns
+            pacer.wait_frame()
+            # MyApp.render returns right away while hidden, otherwise build the ui + swap with vsync
+            if pacer.hidden:
+                continue
+            frames.append(time.monotonic())
+            time.sleep(VSYNC)
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+
+    def phase(name: str, during=None):
+        start, n0 = time.monotonic(), len(frames)
+        while time.monotonic() - start < args.phase:
+            if during is not None:
+                during()
+            time.sleep(.25)
+        n = len(frames) - n0
+        print(f'{name:>28}: {n / args.phase:5.1f} fps')
+        return start
+
+    def wake_latency(name: str, wake):
+        n0 = len(frames)
+        t0 = time.monotonic()
+        wake()
+        while len(frames) == n0:
+            time.sleep(.0005)
+        print(f'{name:>28}: next frame after {(frames[n0] - t0) * 1e3:.1f}ms')
+
+    # status updates at 4 per second
+    phase('status updates coming in', pacer.activity)
+    time.sleep(pacer.active_period)
+    phase('idle')
+    wake_latency('status update while idle', pacer.activity)
+    time.sleep(pacer.active_period)
+    # input arrives as a window event, i.e. the wait returns early
+    time.sleep(1 / pacer.idle_fps / 2)
+    wake_latency('input while idle', events.wake)
+    pacer.hide()
+    time.sleep(.1)
+    turns0 = turns
+    start = phase('hidden')
+    print(f'{"":>28}  {(turns - turns0) / (time.monotonic() - start):5.1f} loop turns/s')
+    wake_latency('shown from another thread', pacer.show)
+    pacer.hide()
+    time.sleep(.5)
+    wake_latency('shown from the loop', lambda: queued.append(pacer.show))
+
+    running = False
+    pacer.stop()
+    thread.join()
+
+
+if __name__ == '__main__':
+    main()
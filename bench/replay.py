@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+"""
+Replays a status recording through the automation pipeline
+using the fake window backend and reports latency and throughput
+
+usage: python -m bench.replay <recording.jsonl> [--speed 10] [--repeat 3]
+
+@author Kami-Kaze
+"""
+
+import argparse
+
+from attrs import define, field
+
+from lib import fake_win
+
+# must happen before anything imports lib.globals
+fake_win.install()
+
+from lib.automation import Automation  # noqa: E402
+from lib.globals import WINDOW_NAME  # noqa: E402
+from lib.input import DEFAULT_PRESS_SPACING  # noqa: E402
+from lib.replay import load_recording, replay  # noqa: E402
+from lib.status import decode_status  # noqa: E402
+from lib.window_tracker import WindowTracker  # noqa: E402
+
+
+@define
+class ReplayConfig:
+    active: bool = True
+    auto_fa: bool = True
+    auto_da: bool = True
+    auto_gear: bool = True
+    auto_lights: bool = True
+    auto_night_vision: bool = True
+    rules: list[dict] = field(factory=list)
+    min_press_spacing: float = DEFAULT_PRESS_SPACING
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a status recording through the automation pipeline')
+    parser.add_argument('recording', help='json lines file recorded with File > Record Status')
+    parser.add_argument('--speed', type=float, default=0.0, help='replay speed relative to the recording (default: as fast as possible)')
+    parser.add_argument('--repeat', type=int, default=1, help='number of passes over the recording')
+    parser.add_argument('--timeout', type=float, default=1.0, help='max seconds to wait for a single update')
+    args = parser.parse_args()
+
+    recording = load_recording(args.recording)
+    print(f'Loaded {len(recording)} status updates from {args.recording}')
+
+    for i in range(args.repeat):
+        fake_win.reset()
+        automation = Automation(ReplayConfig())
+        automation.start()
+
+        def on_status(payload: bytes):
+            automation.on_status_update(decode_status(payload).flags)
+
+        # the (fake) window is focused right away
+        window_tracker = WindowTracker(WINDOW_NAME)
+        window_tracker.add_listener(automation.on_focus_change)
+        window_tracker.start()
+
+        report = replay(recording, on_status, args.speed, args.timeout, settle=automation.input.wait_idle)
+        print(f'-------- PASS {i + 1}/{args.repeat} --------')
+        print(report.summary())
+        print(f'press ack:   {automation.tracker.latency.to_json()}')
+        window_tracker.stop()
+        automation.stop()
+
+
+if __name__ == '__main__':
+    main()
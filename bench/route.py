@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+Plans routes through many waypoints on a planet, scattered uniformly and in clusters
+(like survey sites), and reports the time spent per step and the length against the
+plain nearest neighbour tour
+
+usage: python -m bench.route [--stops 500] [--budget .5]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from lib.route import DistanceMatrix, nearest_neighbour, optimize, plan_route, tour_length
+from lib.waypoint import Waypoint, calculate_distances
+
+PLANET = 'Synuefe XR-H d11-102 1 b'
+PLANET_RADIUS = 1716214.375
+POSITION = -12.345678, 123.456789
+
+
+def uniform(rng: random.Random, n: int) -> list[Waypoint]:
+    lat, lon = POSITION
+    return [Waypoint.from_position(f'Site {i}', PLANET, lat + rng.uniform(-2, 2), lon + rng.uniform(-2, 2)) for i in range(n)]
+
+
+def clustered(rng: random.Random, n: int) -> list[Waypoint]:
+    lat, lon = POSITION
+    centers = [(lat + rng.uniform(-2, 2), lon + rng.uniform(-2, 2)) for _ in range(max(n // 25, 1))]
+    waypoints = []
+    for i in range(n):
+        c_lat, c_lon = rng.choice(centers)
+        waypoints.append(Waypoint.from_position(f'Site {i}', PLANET, c_lat + rng.gauss(0, .05), c_lon + rng.gauss(0, .05)))
+    return waypoints
+
+
+def bench(name: str, waypoints: list[Waypoint], budget: float):
+    matrix = DistanceMatrix()
+
+    t0 = time.perf_counter()
+    matrix.get(waypoints, PLANET_RADIUS)
+    t1 = time.perf_counter()
+    matrix.get(waypoints, PLANET_RADIUS)
+    t2 = time.perf_counter()
+
+    # same distances plan_route works on
+    lat = np.fromiter((waypoint.lat for waypoint in waypoints), float, len(waypoints))
+    lon = np.fromiter((waypoint.lon for waypoint in waypoints), float, len(waypoints))
+    n = len(waypoints) + 1
+    d = np.empty((n, n))
+    d[0, 0] = 0.0
+    d[0, 1:] = d[1:, 0] = calculate_distances(POSITION, lat, lon, PLANET_RADIUS)
+    d[1:, 1:] = matrix.get(waypoints, PLANET_RADIUS)
+
+    t3 = time.perf_counter()
+    tour = nearest_neighbour(d)
+    t4 = time.perf_counter()
+    optimized = optimize(d, tour, budget)
+    t5 = time.perf_counter()
+
+    nn, opt = tour_length(d, tour), tour_length(d, optimized)
+    print(f'{name:>9} | {len(waypoints)} stops | matrix {(t1 - t0) * 1e3:6.1f}ms (cached {(t2 - t1) * 1e3:4.1f}ms) | '
+          f'nearest neighbour {(t4 - t3) * 1e3:5.1f}ms {nn / 1e3:8.1f}km | '
+          f'2-opt + Or-opt {(t5 - t4) * 1e3:5.0f}ms {opt / 1e3:8.1f}km ({(1 - opt / nn) * 100:4.1f}% shorter)')
+
+    # planning the rest again after visiting some, the matrix is cached by then
+    t0 = time.perf_counter()
+    route = plan_route(waypoints[0].position, waypoints[len(waypoints) // 10:], PLANET_RADIUS, matrix, budget)
+    t1 = time.perf_counter()
+    print(f'{"":>9} | replanning {len(route.stops)} stops: {(t1 - t0) * 1e3:.0f}ms, {sum(route.legs) / 1e3:.1f}km')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Route planner benchmark')
+    parser.add_argument('--stops', type=int, default=500)
+    parser.add_argument('--budget', type=float, default=.5, help='time budget of the improvement (s)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bench('uniform', uniform(rng, args.stops), args.budget)
+    bench('clustered', clustered(rng, args.stops), args.budget)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""
+Types a query into the waypoint filter one character at a time and tries misspelled
+queries across the ratio slider, scoring every waypoint (the old _filter_waypoints)
+against WaypointSearch, checks both find the same waypoints and reports what
+building the index costs at load and per added waypoint
+
+usage: python -m bench.search [--waypoints 50000] [--query "crash site"]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import random
+import time
+
+from fuzzywuzzy.fuzz import partial_ratio
+
+from lib import fake_win
+
+# lib.globals pulls in lib.win, not needed here
+fake_win.install()
+
+from lib.globals import DEFAULT_FUZZY_RATIO  # noqa: E402
+from lib.search import WaypointSearch  # noqa: E402
+from lib.waypoint import Waypoint  # noqa: E402
+
+WORDS = ['crash', 'site', 'base', 'geyser', 'bio', 'signal', 'camp', 'outpost', 'ruins', 'guardian',
+         'thargoid', 'brain tree', 'lagrange', 'mine', 'pod', 'wreck', 'fumarole', 'settlement', 'alpha']
+# misspelled queries, none of them shares a trigram with what they should find
+TYPOS = ['abxd', 'bsae', 'alhpa', 'carsh stie']
+
+
+def waypoints(n: int) -> list[Waypoint]:
+    rng = random.Random(0)
+    sectors = ['Synuefe', 'Col 285', 'HIP', 'Pleiades', 'Wregoe', 'Praea Euq', 'Blu Thua']
+    planets = [f'{rng.choice(sectors)} {rng.choice("ABCDEFGH")}{rng.choice("XYZ")}-{rng.choice("ABCDEFGH")} d{rng.randint(1, 30)}-{rng.randint(1, 300)} '
+               f'{rng.randint(1, 9)} {rng.choice("abcdef")}' for _ in range(n // 50 + 1)]
+    return [Waypoint.from_position(f'{rng.choice(WORDS)} {rng.choice(WORDS)} {i}', rng.choice(planets), 0.0, 0.0) for i in range(n - 1)] + \
+        [Waypoint.from_position('Abcd', rng.choice(planets), 0.0, 0.0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Waypoint filter micro-benchmark')
+    parser.add_argument('--waypoints', type=int, default=50_000)
+    parser.add_argument('--query', default='crash site')
+    parser.add_argument('--ratio', type=int, default=DEFAULT_FUZZY_RATIO)
+    args = parser.parse_args()
+
+    points = waypoints(args.waypoints)
+    t0 = time.perf_counter()
+    search = WaypointSearch(points)
+    build = time.perf_counter() - t0
+    extra = waypoints(args.waypoints + 1000)[args.waypoints:]
+    t0 = time.perf_counter()
+    for point in extra:
+        search.add(point)
+    added = (time.perf_counter() - t0) / len(extra)
+    for point in extra:
+        search.remove(point)
+    print(f'{args.waypoints} waypoints, index ({len(search.trigrams)} trigrams) built at load in {build * 1e3:.0f}ms, '
+          f'{added * 1e6:.1f}us per added waypoint')
+
+    worst_scan = worst_index = 0.0
+    mismatches = 0
+
+    def compare(query: str, ratio: int):
+        nonlocal worst_scan, worst_index, mismatches
+        t0 = time.perf_counter()
+        expected = {p.id for p in points if ratio <= partial_ratio(query, f'{p.name} {p.planet}'.lower())}
+        t1 = time.perf_counter()
+        found = {p.id for p in search.search(query, ratio)}
+        t2 = time.perf_counter()
+
+        worst_scan, worst_index = max(worst_scan, t1 - t0), max(worst_index, t2 - t1)
+        mismatches += found != expected
+        print(f'{query!r:<14} | {ratio:5} | {(t1 - t0) * 1e3:8.1f}ms | {(t2 - t1) * 1e3:8.1f}ms | {search.scored:6} | '
+              f'{len(found)} ({len(expected)} full scan{"" if found == expected else ", DIFFERENT"})')
+
+    print(f'{"query":<14} | ratio | {"full scan":>10} | {"index":>10} | scored | matches')
+    # typing the query one character at a time
+    for i in range(1, len(args.query) + 1):
+        compare(args.query[:i], args.ratio)
+    print(f'worst keystroke: {worst_scan * 1e3:.1f}ms full scan, {worst_index * 1e3:.1f}ms index')
+
+    # typos only a fuzzy match finds, across the ratio slider
+    for query in TYPOS:
+        for ratio in (0, args.ratio, 90, 100):
+            compare(query, ratio)
+
+    # long queries at high ratios are where the index narrows things down
+    for ratio in (90, 100):
+        compare(args.query, ratio)
+
+    print(f'{mismatches} searches returned something else than the full scan')
+    assert not mismatches
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+"""
+Startup time: from launching the process to the first frame and the first status update processed
+
+Runs the app in a child process inside a scratch directory (its own .data and ED folder
+with a Status.json in it), with the version check pointed at a local stand-in server:
+    cold       no cached version check, the server answers right away
+    warm       version check cached in .data, the server should not be asked at all
+    slow       no cached version check, the server takes --delay seconds to answer
+    offline    no cached version check, nothing listens on the port
+
+The app exits by itself once it rendered a frame, processed a status update and the
+version check finished (or after --max-seconds).
+
+usage: python -m bench.startup [--delay 3] [--waypoints 20000]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import http.server
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from lib.ed import Status
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LATEST_VERSION = '99.0.0'
+STATUS = {
+    'timestamp': '2023-11-24T12:00:00Z', 'event': 'Status', 'Flags': int(Status.HAS_LAT_LONG), 'Latitude': -12.345678, 'Longitude': 123.456789,
+    'Heading': 90, 'Altitude': 0, 'BodyName': 'Synuefe XR-H d11-102 1 b', 'PlanetRadius': 1716214.375,
+}
+
+
+class VersionServer(http.server.ThreadingHTTPServer):
+    """
+    Stand-in for the .version file on github, answers every request with LATEST_VERSION after delay
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.requests = 0
+        super().__init__(('127.0.0.1', 0), VersionHandler)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/.version'
+
+
+class VersionHandler(http.server.BaseHTTPRequestHandler):
+    server: VersionServer
+
+    def do_GET(self):
+        self.server.requests += 1
+        time.sleep(self.server.delay)
+        body = LATEST_VERSION.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+def free_port_url() -> str:
+    """
+    @return: url on a port nothing listens on
+    """
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return f'http://127.0.0.1:{s.getsockname()[1]}/.version'
+
+
+def child(base_path: str, url: str, t0: float, max_seconds: float):
+    marks = {}
+
+    def mark(name: str):
+        if name not in marks:
+            marks[name] = time.time() - t0
+
+    from lib import ed, fake_win
+
+    # stays in the scratch directory
+    ed.BasePath = base_path
+    try:
+        import win32api  # noqa: F401
+    except ImportError:
+        # not on windows, lib.globals pulls in lib.win
+        fake_win.install()
+
+    mark('interpreter')
+    import lib.app
+    lib.app.VERSION_REF_URL = url
+    mark('imports')
+
+    class TimedApp(lib.app.MyApp):
+        def on_status_update(self, status_data: bytes):
+            super().on_status_update(status_data)
+            mark('first status')
+
+        def render(self):
+            super().render()
+            mark('first frame')
+            if self.version_check.done.is_set():
+                mark('version check')
+                if 'first status' in marks:
+                    self.exit()
+
+    app = TimedApp()
+    mark('init')
+
+    timer = threading.Timer(max_seconds, app.exit)
+    timer.daemon = True
+    timer.start()
+    app.run()
+    marks['latest'] = app.version_check.latest
+    print(json.dumps(marks), flush=True)
+
+
+def run(name: str, directory: str, url: str, server: VersionServer or None, max_seconds: float):
+    requests = server.requests if server is not None else 0
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (ROOT, os.getenv('PYTHONPATH')))))
+    t0 = time.time()
+    output = subprocess.run([sys.executable, '-m', 'bench.startup', '--child', os.path.join(directory, 'ed'), '--url', url,
+                             '--t0', repr(t0), '--max-seconds', str(max_seconds)],
+                            cwd=directory, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        print(f'{name:>8} | failed:\n{output.stderr}')
+        return
+
+    marks = json.loads(output.stdout.strip().splitlines()[-1])
+    served = (server.requests if server is not None else 0) - requests
+
+    def ms(key: str) -> str:
+        return f'{marks[key] * 1e3:6.0f}ms' if key in marks else '     n/a'
+
+    print(f'{name:>8} | interpreter {ms("interpreter")} | imports {ms("imports")} | init {ms("init")} | '
+          f'first frame {ms("first frame")} | first status {ms("first status")} | version check {ms("version check")} '
+          f'({served} requests, latest {marks.get("latest")})')
+
+
+def setup(directory: str, waypoints: int):
+    shutil.copytree(os.path.join(ROOT, 'resources'), os.path.join(directory, 'resources'))
+    with open(os.path.join(directory, '.version'), 'w') as f:
+        f.write('1.0.0')
+
+    os.makedirs(os.path.join(directory, 'ed'))
+    with open(os.path.join(directory, 'ed', 'Status.json'), 'w') as f:
+        json.dump(STATUS, f)
+
+    os.makedirs(os.path.join(directory, '.data'))
+    rng = random.Random(0)
+    with open(os.path.join(directory, '.data', 'waypoints.json'), 'w') as f:
+        json.dump([{'id': str(uuid.UUID(int=rng.getrandbits(128))), 'name': f'Waypoint {i}', 'planet': f'Planet {i % 50}',
+                    'lat': rng.uniform(-90, 90), 'lon': rng.uniform(-180, 180)} for i in range(waypoints)], f)
+
+
+def clear_cache(directory: str):
+    try:
+        os.remove(os.path.join(directory, '.data', 'version.json'))
+    except FileNotFoundError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time benchmark')
+    parser.add_argument('--delay', type=float, default=3.0, help='answer delay of the slow version server (s)')
+    parser.add_argument('--waypoints', type=int, default=1000, help='saved waypoints')
+    parser.add_argument('--max-seconds', type=float, default=15.0, help='stop each run after this long (s)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    parser.add_argument('--t0', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        child(args.child, args.url, args.t0, args.max_seconds)
+        return
+
+    fast, slow = VersionServer(0.0), VersionServer(args.delay)
+    for server in (fast, slow):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup(directory, args.waypoints)
+        print(f'{args.waypoints} waypoints, slow server answers after {args.delay:.1f}s')
+
+        run('cold', directory, fast.url, fast, args.max_seconds)
+        run('warm', directory, fast.url, fast, args.max_seconds)
+        clear_cache(directory)
+        run('slow', directory, slow.url, slow, args.max_seconds)
+        clear_cache(directory)
+        run('offline', directory, free_port_url(), None, args.max_seconds)
+
+    fast.shutdown()
+    slow.shutdown()
+
+
+if __name__ == '__main__':
+    main()
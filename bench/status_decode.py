@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compares decode_status against plain json.loads + dict lookups
+
+usage: python -m bench.status_decode [--number 100000]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import json
+import timeit
+
+from lib.ed import Status
+from lib.status import JSON_BACKEND, decode_status
+
+ON_PLANET = (b'{ "timestamp":"2023-11-20T18:03:51Z", "event":"Status", "Flags":555745288, "Flags2":0, '
+             b'"Pips":[4,8,0], "FireGroup":0, "GuiFocus":0, "Fuel":{ "FuelMain":16.000000, "FuelReservoir":0.450000 }, '
+             b'"Cargo":0.000000, "LegalState":"Clean", "Latitude":-12.345678, "Longitude":123.456789, "Heading":271, '
+             b'"Altitude":1234, "BodyName":"Synuefe XR-H d11-102 1 b", "PlanetRadius":1716214.375000, "Balance":123456789 }')
+
+IN_SPACE = (b'{ "timestamp":"2023-11-20T18:03:51Z", "event":"Status", "Flags":16777240, "Flags2":0, '
+            b'"Pips":[4,8,0], "FireGroup":0, "GuiFocus":0, "Fuel":{ "FuelMain":16.000000, "FuelReservoir":0.450000 }, '
+            b'"Cargo":0.000000, "LegalState":"Clean", "Balance":123456789 }')
+
+
+def dict_path(payload: bytes):
+    # what MyApp.on_status_update used to do
+    data = json.loads(payload)
+    flags = data['Flags']
+    if flags & Status.HAS_LAT_LONG:
+        return flags, (data['Latitude'], data['Longitude']), data['Heading'], data['PlanetRadius'], data['Altitude'], data['BodyName']
+    return flags
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Status decoding micro-benchmark')
+    parser.add_argument('--number', type=int, default=100_000, help='decodes per measurement')
+    args = parser.parse_args()
+
+    print(f'decode_status json backend: {JSON_BACKEND}')
+    for name, payload in (('on planet', ON_PLANET), ('in space', IN_SPACE)):
+        for label, fn in (('dict path', dict_path), ('decode_status', decode_status)):
+            t = min(timeit.repeat(lambda: fn(payload), number=args.number, repeat=5))
+            print(f'{name:>10} | {label:<14} {t / args.number * 1e6:.2f}us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+Kills a process hammering a WaypointStore at random points and checks nothing got lost
+
+A child process applies a deterministic sequence of changes (adds, edits and deletes)
+and reports each one once the store returned. After a random delay it is killed, the
+store is loaded again and has to contain every reported change (plus maybe the one
+in flight). Compaction is set to happen often, so kills also land in the middle of it.
+
+usage: python -m bench.store_crash [--rounds 20] [--max-delay .5]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from lib import fake_win
+
+# lib.globals pulls in lib.win, not needed here
+fake_win.install()
+
+from lib.store import WaypointStore  # noqa: E402
+from lib.waypoint import Waypoint  # noqa: E402
+
+COMPACT_AFTER = 25
+IDS = 200
+
+
+def change(i: int) -> Waypoint or str:
+    """
+    @return: the i-th change, a waypoint to put or the id of one to delete
+    """
+    rng = random.Random(i)
+    id = f'waypoint-{rng.randrange(IDS)}'
+    if rng.random() < .2:
+        return id
+    return Waypoint(id, f'Waypoint {i}', f'Planet {rng.randrange(5)}', rng.uniform(-90, 90), rng.uniform(-180, 180))
+
+
+def expected(n: int) -> dict[str, dict]:
+    """
+    @return: state after the first n changes
+    """
+    state = {}
+    for i in range(n):
+        if isinstance(c := change(i), str):
+            state.pop(c, None)
+        else:
+            state[c.id] = c.__dict__
+    return state
+
+
+def child(path: str, start: int):
+    store = WaypointStore(path, compact_after=COMPACT_AFTER)
+    store.load()
+    i = start
+    while True:
+        if isinstance(c := change(i), str):
+            store.delete(Waypoint(c, '', '', 0.0, 0.0))
+        else:
+            store.put(c)
+        print(i, flush=True)
+        i += 1
+
+
+def run_round(path: str, start: int, delay: float) -> tuple[int, int]:
+    """
+    @return: changes reported by the child, changes found in the store afterwards
+    """
+    process = subprocess.Popen([sys.executable, '-m', 'bench.store_crash', '--child', path, '--start', str(start)],
+                               stdout=subprocess.PIPE, text=True)
+    reported = [start - 1]
+
+    def read():
+        for line in process.stdout:
+            reported[0] = int(line)
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    time.sleep(delay)
+    process.kill()
+    process.wait()
+    reader.join()
+
+    done = reported[0] + 1
+    store = WaypointStore(path)
+    state = {waypoint.id: waypoint.__dict__ for waypoint in store.load()}
+    store.close()
+
+    # the change in flight when we killed it might have made it as well
+    for n in (done, done + 1):
+        if state == expected(n):
+            return done, n
+    raise AssertionError(f'lost changes: reported {done}, store matches none of the states after {done} or {done + 1} changes')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WaypointStore crash test')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--max-delay', type=float, default=.5, help='max time before killing the child (s)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--start', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        child(args.child, args.start)
+        return
+
+    rng = random.Random()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'waypoints.json')
+        start = 0
+        for r in range(args.rounds):
+            reported, start = run_round(path, start, rng.uniform(.05, args.max_delay))
+            print(f'round {r + 1:>3}: {reported} changes reported, {start} in store')
+
+    print('no changes lost')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+Writes and reads back waypoint files in every supported format, reporting
+throughput and peak memory of the streaming reader, and imports them into a
+repository journaling to a WaypointStore like the app does
+
+usage: python -m bench.transfer [--rows 1000000] [--import-rows 100000]
+
+@author Kami-Kaze
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from lib import fake_win
+
+# lib.globals pulls in lib.win, not needed here
+fake_win.install()
+
+from lib.repository import Change, WaypointRepository  # noqa: E402
+from lib.store import WaypointStore  # noqa: E402
+from lib.transfer import export_waypoints, import_waypoints, read_waypoints  # noqa: E402
+from lib.waypoint import Waypoint  # noqa: E402
+
+
+def waypoints(n: int):
+    rng = random.Random(0)
+    for i in range(n):
+        yield Waypoint(f'{i:08x}', f'Site {i}', f'Planet {i % 1000}', rng.uniform(-90, 90), rng.uniform(-180, 180))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Waypoint import/export benchmark')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='rows per file')
+    parser.add_argument('--import-rows', type=int, default=100_000, help='rows imported into a repository')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # .ndjson is just another name for .jsonl
+        for extension in ('.csv', '.geojson', '.jsonl'):
+            path = os.path.join(directory, f'waypoints{extension}')
+
+            t0 = time.perf_counter()
+            export_waypoints(path, waypoints(args.rows))
+            t_write = time.perf_counter() - t0
+
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            rows = errors = 0
+            for _, waypoint in read_waypoints(path):
+                rows += 1
+                errors += isinstance(waypoint, str)
+            t_read = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            size = os.path.getsize(path)
+            print(f'{extension:>8} | {size / 2 ** 20:7.1f}MB | write {t_write:6.2f}s | read {t_read:6.2f}s (traced) '
+                  f'{rows} rows, {errors} errors, peak {peak / 2 ** 20:.1f}MB')
+
+            if args.import_rows:
+                export_waypoints(path, waypoints(args.import_rows))
+                store = WaypointStore(os.path.join(directory, f'store{extension}.json'))
+                store.load()
+                repository = WaypointRepository()
+                repository.add_listener(lambda change, waypoint: store.put(waypoint) if change is Change.ADDED else None)
+                t0 = time.perf_counter()
+                with store.batch():
+                    report = import_waypoints(path, repository)
+                t_import = time.perf_counter() - t0
+                # a second import only finds duplicates
+                report_again = import_waypoints(path, repository)
+                store.close()
+                print(f'{"":>8} | import {args.import_rows} rows (journaled) {t_import:6.2f}s: {report.summary()}, '
+                      f'again: {report_again.summary()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+Closed loop key presses: a press only counts once the game's status shows its effect
+
+@author Kami-Kaze
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from lib.globals import LOGGER
+from lib.metrics import Histogram
+from lib.rules import CompiledRule
+from lib.ship_state import ShipState
+
+# until we have enough measurements, wait this long (s) for a press to show up in the status
+DEFAULT_ACK_TIMEOUT = 1.0
+# once we do, wait ACK_TIMEOUT_FACTOR * p95 of the measured latency, clamped to these bounds.
+# retrying a press the game did get toggles the flag back, so the floor covers a slow Status.json write
+MIN_ACK_TIMEOUT = 1.0
+MAX_ACK_TIMEOUT = 3.0
+ACK_TIMEOUT_FACTOR = 2.0
+ACK_MIN_SAMPLES = 20
+# each retry waits this much longer than the one before
+ACK_BACKOFF = 2.0
+ACK_MAX_ATTEMPTS = 3
+
+
+@dataclass
+class PendingPress:
+    rule: CompiledRule
+    attempt: int
+    sent_at: float
+    deadline: float
+
+
+class PressTracker:
+    """
+    Keeps track of presses until the status confirms them (the rule's flag reached its desired state).
+
+    - further presses for a flag are suppressed while one is in flight
+    - unconfirmed presses time out (with backoff) and on_timeout is called so the
+      caller can re-evaluate and press again, after ACK_MAX_ATTEMPTS we give up on
+      the flag until it changes by other means
+    - press to confirmation latency is kept in a histogram, which also drives the timeout
+    """
+
+    def __init__(self, press: Callable[[CompiledRule], None], on_timeout: Callable[[], None]):
+        self.press = press
+        self.on_timeout = on_timeout
+        self.latency = Histogram()
+
+        # presses confirmed/suppressed/retried and flags we gave up on
+        self.confirmed = 0
+        self.suppressed = 0
+        self.retries = 0
+        self.failures = 0
+
+        self._in_flight: dict[int, PendingPress] = {}
+        self._attempts: dict[int, int] = {}
+        self._given_up = 0
+        self._lock = threading.Lock()
+        self._timer: threading.Timer or None = None
+        self._timer_deadline: float or None = None
+
+    @property
+    def timeout(self) -> float:
+        if self.latency.count < ACK_MIN_SAMPLES:
+            return DEFAULT_ACK_TIMEOUT
+        return min(max(self.latency.percentile(.95) * ACK_TIMEOUT_FACTOR, MIN_ACK_TIMEOUT), MAX_ACK_TIMEOUT)
+
+    def request(self, rule: CompiledRule) -> bool:
+        """
+        Presses the rule's key bind unless a press for its flag is already in flight
+
+        @return: whether the key was pressed
+        """
+        with self._lock:
+            if rule.mask in self._in_flight or rule.mask & self._given_up:
+                self.suppressed += 1
+                return False
+
+            attempt = self._attempts.get(rule.mask, 0) + 1
+            self._attempts[rule.mask] = attempt
+            if attempt > 1:
+                self.retries += 1
+
+            now = time.perf_counter()
+            self._in_flight[rule.mask] = PendingPress(rule, attempt, now, now + self.timeout * ACK_BACKOFF ** (attempt - 1))
+            self._schedule()
+
+        self.press(rule)
+        return True
+
+    def on_state(self, state: ShipState) -> list[CompiledRule]:
+        """
+        @return: rules whose pending press got confirmed by state
+        """
+        with self._lock:
+            # flags changed by other means (e.g. manually), worth trying again
+            self._given_up &= ~state.delta
+            for mask in [mask for mask in self._attempts if mask & state.delta and mask not in self._in_flight]:
+                del self._attempts[mask]
+
+            if not self._in_flight:
+                return []
+
+            now = time.perf_counter()
+            confirmed = []
+            for mask, pending in list(self._in_flight.items()):
+                if state.flags & mask == pending.rule.desired:
+                    del self._in_flight[mask]
+                    self._attempts.pop(mask, None)
+                    self.latency.record(now - pending.sent_at)
+                    self.confirmed += 1
+                    confirmed.append(pending.rule)
+
+            self._schedule()
+            return confirmed
+
+    def clear(self):
+        """
+        Forgets about everything in flight (e.g. the game lost focus and won't see our presses)
+        """
+        with self._lock:
+            self._in_flight.clear()
+            self._attempts.clear()
+            self._schedule()
+
+    def stop(self):
+        with self._lock:
+            self._in_flight.clear()
+            self._schedule()
+
+    def _schedule(self):
+        deadline = min((pending.deadline for pending in self._in_flight.values()), default=None)
+        if deadline == self._timer_deadline:
+            return
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        self._timer_deadline = deadline
+        if deadline is not None:
+            self._timer = threading.Timer(max(deadline - time.perf_counter(), 0.0), self._on_deadline)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_deadline(self):
+        with self._lock:
+            self._timer = None
+            self._timer_deadline = None
+            now = time.perf_counter()
+            expired = [mask for mask, pending in self._in_flight.items() if pending.deadline <= now]
+            for mask in expired:
+                pending = self._in_flight.pop(mask)
+                if pending.attempt >= ACK_MAX_ATTEMPTS:
+                    LOGGER.warning(f'{pending.rule.name}: no reaction after {pending.attempt} attempts, giving up')
+                    self._attempts.pop(mask, None)
+                    self._given_up |= mask
+                    self.failures += 1
+
+            self._schedule()
+
+        if expired:
+            self.on_timeout()
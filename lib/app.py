@@ -6,24 +6,40 @@
 """
 
 import json
+import math
+import threading
 import time
-from collections import defaultdict
 
+import glfw
 import imgui
-from attrs import define
+from attrs import define, field
 from essentials.gui.app import App, AppConfig
 from essentials.gui.config import Config
 from essentials.io.file import open_or_create
-from essentials.utils.versioning import Version, check_version
-from fuzzywuzzy.fuzz import partial_ratio
+from essentials.utils.versioning import Version
 from prefixed import Float
 
-from lib.ed import Status
+from lib.automation import Automation
 from lib.filesystem import Watchdog
+from lib.flight_recorder import FlightRecorder
 from lib.globals import *
-from lib.ship_state import ShipState
-from lib.util import find_first_available
-from lib.waypoint import Waypoint, calculate_bearing, calculate_distance
+from lib.input import DEFAULT_PRESS_SPACING
+from lib.journal import JournalTailer
+from lib.metrics import RING_SIZE, TIMINGS, timed
+from lib.motion import MotionModel
+from lib.pacing import FramePacer
+from lib.replay import StatusRecorder
+from lib.route import DistanceMatrix, Route, plan_route
+from lib.repository import Change, WaypointRepository
+from lib.search import WaypointSearch
+from lib.spatial import WaypointIndex
+from lib.store import WaypointStore
+from lib.status import decode_status
+from lib.transfer import FORMATS, export_waypoints, import_waypoints
+from lib.version import VersionCheck
+from lib.views import WaypointViews
+from lib.window_tracker import WindowTracker
+from lib.waypoint import Waypoint, WaypointMeter, calculate_bearing, calculate_distance
 
 
 @define
@@ -50,6 +66,14 @@ class MyConfig(Config):
     show_planet_names: bool = True
     group_by_planet: bool = True
     filter_current_planet: bool = True
+    sort_by_distance: bool = False
+    # a route moves on to the next stop within this distance (m)
+    arrival_distance: float = DEFAULT_ARRIVAL_DISTANCE
+    # user defined automation rules, see lib.rules
+    rules: list[dict] = field(factory=list)
+    min_press_spacing: float = DEFAULT_PRESS_SPACING
+    # keep every status sample, see lib.flight_recorder
+    flight_recorder: bool = False
 
 
 class MyApp(App):
@@ -68,28 +92,30 @@ class MyApp(App):
         self.window.floating = self.config.floating
         self.window.background_color = (.1, .1, .1, 1.)
 
-        self.watchdog = Watchdog(ed.BasePath, ed.Files.STATUS, self.on_status_update)
+        self.journal = JournalTailer(ed.BasePath, JOURNAL_CHECKPOINT_FILE)
+        self.watchdog = Watchdog(ed.BasePath)
+        self.watchdog.watch(ed.Files.STATUS, self.on_status_update)
+        self.watchdog.watch_pattern(ed.Files.JOURNAL_PATTERN, self.on_journal_update)
 
-        self.state = ShipState()
-        self.was_docked_or_landed = False
-        self.last_focused_at = time.time()
+        self.automation = Automation(self.config)
+        self.window_tracker = WindowTracker(WINDOW_NAME)
+        self.window_tracker.add_listener(self.automation.on_focus_change)
+        self.status_recorder: StatusRecorder or None = None
+        self.flight_recorder: FlightRecorder or None = None
 
         with open_or_create(VERSION_FILE, 'r', '0.0.0') as vf:
-            self.current_version = Version.parse_version(vf.read())
-        self.latest_version = check_version(self.current_version, VERSION_REF_URL)
+            version = vf.read()
+        self.current_version = Version.parse_version(version)
 
         # ensure data dir exists
         os.makedirs(DATA_DIR, exist_ok=True)
 
-        with open_or_create(WAYPOINT_FILE, 'r', '[]') as wpf:
-            try:
-                self.waypoints = json.load(wpf, object_hook=Waypoint.from_json)
-            except Exception:
-                p = find_first_available(WAYPOINT_BACKUP_PATTERN, lambda p: os.path.exists(p))
-                LOGGER.error(f'Failed to read waypoints file! A backup has been saved to {p}')
-                with open(p, 'w') as backup:
-                    backup.write(wpf.read())
-                self.waypoints = []
+        # in the background, the window should not wait for the network
+        self.version_check = VersionCheck(version, VERSION_REF_URL)
+        self.version_check.start()
+
+        self.waypoint_store = WaypointStore(WAYPOINT_FILE)
+        self.waypoints = WaypointRepository(self.waypoint_store.load())
 
         self.has_position = False
         self.position = 0.0, 0.0
@@ -98,76 +124,82 @@ class MyApp(App):
         self.planet_radius = 0.0
         self.altitude = 0.0
 
-        self.current_waypoint = None
+        # body we're at according to the journal, also known without a lat/long reading
+        self.current_body = ''
 
-        self.filtered_waypoints = list()
-        self.filtered_waypoints_by_planet = defaultdict(lambda: [])
+        self.current_waypoint = None
+        self.waypoint_index = WaypointIndex(self.waypoints)
+        # (distance, waypoint) of the closest waypoint on the current planet
+        self.nearest_waypoint: tuple[float, Waypoint] or None = None
+        # live distance, bearing and eta to every waypoint on the current planet
+        self.waypoint_meter = WaypointMeter(self.waypoints)
+        self.waypoint_search = WaypointSearch(self.waypoints)
+
+        self.waypoint_views = WaypointViews()
+
+        # visiting order through many waypoints, current_waypoint follows it while it's set
+        self.route: Route or None = None
+        self.route_matrix = DistanceMatrix()
+        self._route_planner: threading.Thread or None = None
+        self._importer: threading.Thread or None = None
         self._filter_waypoints()
 
+        # refilter once per frame, not once per change (e.g. when importing)
+        self._waypoints_changed = False
+        self.waypoints.add_listener(self.waypoint_index.on_waypoint_change)
+        self.waypoints.add_listener(self.waypoint_search.on_waypoint_change)
+        self.waypoints.add_listener(self.on_waypoint_change)
+
+        # full frame rate only while something happens
+        self.frame_pacer = FramePacer(glfw.wait_events_timeout, glfw.post_empty_event)
+        self.frame_pacer.hidden = self.config.start_minimized
+
+        # smooths position, bearing and distance between status updates
+        self.motion = MotionModel()
+
         # eta related
         self._last_status_update: float or None = None
         self.recent_average_velocity: float or None = None
 
     def update(self):
-        # don't do anything if window is not found/focused
-        if not win.is_window_focused(win.find_window(WINDOW_NAME)):
-            self.last_focused_at = 0
-            return
-        elif self.last_focused_at == 0:
-            self.last_focused_at = time.time()
-
-        # seems ED: struggles if you send commands right away,
-        # so we need to wait a bit (50ms) before going ham :)
-        focused = time.time() - self.last_focused_at > .05
-        if not focused:
-            return
-
-        if not self.config.active or self.state.processed:
+        # blocks until the next frame is due, automation keeps running on its own threads meanwhile
+        if not self.frame_pacer.wait_frame():
+            # hidden, let the loop turn so it can dispatch show
             return
+        self._update()
 
-        if self.config.auto_fa:
-            self.check_flight_assist()
-        if self.config.auto_da:
-            self.check_drive_assist()
-        if self.config.auto_gear:
-            self.check_gear()
-        if self.config.auto_lights:
-            self.check_lights()
-        if self.config.auto_night_vision:
-            self.check_night_vision()
-
-        self.state.processed = True
+    @timed('update')
+    def _update(self):
+        # automation is driven by status updates and the window tracker, only catch up on waypoint changes
+        if self._waypoints_changed:
+            self._waypoints_changed = False
+            self._filter_waypoints()
 
+    @timed('on_status_update')
     def on_status_update(self, status_data: bytes):
-        data = json.loads(status_data)
-        flags = data['Flags']
-
-        self.state = ShipState()
-
-        self.state.drive_assist = flags & Status.SRV_DRIVE_ASSIST
-        self.state.flight_assist = not flags & Status.FLIGHT_ASSIST_OFF
-        self.state.gear = flags & Status.GEAR_DOWN
+        if (recorder := self.status_recorder) is not None:
+            recorder.record(status_data)
 
-        self.state.in_srv = flags & Status.IN_SRV
-        self.state.fsd_active = flags & (Status.FSD_CHARGING | Status.SUPER_CRUISE | Status.FSD_JUMP)
-        self.state.docked_or_landed = flags & (Status.DOCKED | Status.LANDED)
-        self.was_docked_or_landed |= self.state.docked_or_landed
+        status = decode_status(status_data)
+        self.frame_pacer.activity()
+        if (flight_recorder := self.flight_recorder) is not None:
+            flight_recorder.record(time.time(), status)
 
-        self.state.lights = flags & Status.LIGHTS_ON
-        self.state.night_vision = flags & Status.NIGHT_VISION
+        self.automation.on_status_update(status.flags)
 
-        self.has_position = flags & Status.HAS_LAT_LONG
+        self.has_position = status.has_position
         if self.has_position:
             last_position = self.position
-            self.position = data['Latitude'], data['Longitude']
-            self.heading = data['Heading']
-            self.planet_radius = data['PlanetRadius']
-            self.altitude = data['Altitude']
-            planet_name = data['BodyName']
+            self.position = status.position
+            self.heading = status.heading
+            self.planet_radius = status.planet_radius
+            self.altitude = status.altitude
+            planet_name = status.body_name
 
             if planet_name != self.planet_name:
                 self.planet_name = planet_name
-                self._filter_waypoints()
+                # refiltered on the ui thread
+                self._waypoints_changed = True
 
             # update eta tracking stats
             t1 = time.time()
@@ -183,62 +215,65 @@ class MyApp(App):
                     self.recent_average_velocity = self.recent_average_velocity * (1.0 - k) + v * k
 
             self._last_status_update = t1
+            self.motion.update(t1, self.position, self.heading, self.altitude, self.planet_radius)
+
+            nearest = self.waypoint_index.nearest(self.planet_name, self.position, 1, self.planet_radius + self.altitude)
+            self.nearest_waypoint = nearest[0] if nearest else None
+            self.waypoint_meter.measure(self.planet_name, self.position, self.planet_radius + self.altitude, self.recent_average_velocity)
+            self._check_arrival()
 
         else:
             self.position = 0.0, 0.0
             self.heading = 0.0
             self.planet_radius = 0.0
             self.altitude = 0.0
-            self.planet_name = ''
+            if self.planet_name:
+                self.planet_name = ''
+                self._waypoints_changed = True
+            self.nearest_waypoint = None
+            self.waypoint_meter.clear()
+
+            self.motion.clear()
 
             # reset eta tracking stats
             self.recent_average_velocity = None
             self._last_status_update = None
 
-    def check_flight_assist(self):
-        if self.state.in_srv or self.state.docked_or_landed or self.state.fsd_active:
-            return
-
-        if self.state.flight_assist:
-            LOGGER.debug('Disable Flight assist')
-            win.press_key(KEY_FA, KEY_GLOBAL_MOD)
-
-    def check_drive_assist(self):
-        if not self.state.in_srv:
-            return
-
-        if self.state.drive_assist:
-            LOGGER.debug('Disable Drive assist')
-            win.press_key(KEY_DA, KEY_GLOBAL_MOD)
-
-    def check_gear(self):
-        if not self.state.gear:
-            return
-
-        if self.was_docked_or_landed and not self.state.docked_or_landed:
-            LOGGER.debug('Retracting gear')
-            self.was_docked_or_landed = False
-            win.press_key(KEY_GEAR, KEY_GLOBAL_MOD)
-
-    def check_lights(self):
-        if self.state.lights:
-            return
-
-        # todo: not sure when one can toggle lights
-        if not self.state.fsd_active:
-            LOGGER.debug('Enable lights')
-            win.press_key(KEY_LIGHTS, KEY_GLOBAL_MOD)
-
-    def check_night_vision(self):
-        if self.state.night_vision:
+    def on_waypoint_change(self, change: Change, waypoint: Waypoint):
+        if change is Change.REMOVED:
+            self.waypoint_store.delete(waypoint)
+            if (route := self.route) is not None:
+                route.remove(waypoint)
+            if self.current_waypoint == waypoint:
+                self.current_waypoint = route.current if route is not None else None
+        else:
+            self.waypoint_store.put(waypoint)
+
+        self.waypoint_meter.invalidate()
+        # an import refilters once it's done
+        if self._importer is None:
+            self._waypoints_changed = True
+
+    def on_journal_update(self, journal: str or None):
+        for event in self.journal.read_events(journal):
+            self.on_journal_event(event)
+
+    def on_journal_event(self, event: dict):
+        match event.get('event'):
+            case 'Location' | 'ApproachBody':
+                self.current_body = event.get('Body', '')
+            case 'Touchdown' | 'Liftoff':
+                self.current_body = event.get('Body', self.current_body)
+                LOGGER.debug(f'{event["event"]} on {self.current_body}')
+            case 'LeaveBody' | 'FSDJump':
+                self.current_body = ''
+
+    @timed('render')
+    def render(self):
+        # nothing to see while hidden, update keeps the loop turning slowly meanwhile
+        if self.frame_pacer.hidden:
             return
 
-        # todo: not sure when one can toggle night vision either
-        if not self.state.fsd_active:
-            LOGGER.debug('Enable lights')
-            win.press_key(KEY_NIGHT_VISION, KEY_GLOBAL_MOD)
-
-    def render(self):
         # --                      HELPERS                      -- #
         indent = 4.0
         red = (0.90, 0.49, 0.13)
@@ -307,6 +342,9 @@ class MyApp(App):
                 imgui.text(f'Position: {waypoint.lat:.4f}, {waypoint.lon:.4f}')
                 imgui.end_tooltip()
 
+        # read once, the status thread swaps in new measurements as they come
+        measurements = self.waypoint_meter.measurements
+
         def waypoint_panel(waypoint: Waypoint):
             # target button
             is_active = self.current_waypoint == waypoint
@@ -341,13 +379,20 @@ class MyApp(App):
             imgui.same_line()
             waypoint_name(waypoint, self.config.show_planet_names and not (self.config.group_by_planet or self.config.filter_current_planet))
 
+            # live distance and eta
+            if measurements is not None and (measured := measurements.get(waypoint)) is not None:
+                distance, bearing, eta = measured
+                imgui.same_line()
+                # eta is nan while we're not moving
+                eta = '' if math.isnan(eta) else f', ETA: {eta:.0f}s'
+                imgui.text_disabled(f'{Float(distance):.2h}m, {bearing:.0f}°{eta}')
+
             # edit button
             popup_name = f'edit_waypoint_{waypoint.id}'
             imgui.same_line()
             if right_button(f'Edit', waypoint.id):
                 imgui.open_popup(popup_name)
 
-            change = False
             if imgui.begin_popup(popup_name):
                 imgui.text('Edit Waypoint')
                 imgui.separator()
@@ -364,17 +409,13 @@ class MyApp(App):
                 if imgui.button(f'Delete Waypoint##{waypoint.id}'):
                     imgui.close_current_popup()
                     self.waypoints.remove(waypoint)
-                    self._filter_waypoints()
-                    if self.current_waypoint == waypoint:
-                        self.current_waypoint = None
 
                 imgui.pop_style_color(2)
 
-                change |= change_name | change_pos
-                imgui.end_popup()
+                if change_name or change_pos:
+                    self.waypoints.update(waypoint)
 
-            if change:
-                self._filter_waypoints()
+                imgui.end_popup()
 
         # --                      MAIN UI                      -- #
 
@@ -386,6 +427,27 @@ class MyApp(App):
             if click:
                 self.config.floating = self.window.floating = floating
 
+            # status recording entry
+            click, recording = imgui.menu_item('Record Status', None, self.status_recorder is not None)
+            if click:
+                self._toggle_status_recording(recording)
+
+            click, recording = imgui.menu_item('Flight Recorder', None, self.flight_recorder is not None)
+            if click:
+                self.config.flight_recorder = recording
+                self._toggle_flight_recorder(recording)
+
+            imgui.separator()
+            click, _ = imgui.menu_item('Importing Waypoints...' if self._importer is not None else 'Import Waypoints...', None,
+                                       False, self._importer is None)
+            if click:
+                self._import_waypoints()
+
+            click, _ = imgui.menu_item('Export Waypoints...', None)
+            if click:
+                self._export_waypoints()
+            imgui.separator()
+
             # exit entry
             click, _ = imgui.menu_item('Exit', None)
             if click:
@@ -395,10 +457,10 @@ class MyApp(App):
         imgui.end_menu_bar()
 
         # status button
-        yes_no(win.find_window(WINDOW_NAME), 'Elite Running')
+        yes_no(self.window_tracker.running, 'Elite Running')
 
         # version info
-        if self.latest_version is not None:
+        if self.version_check.latest is not None:
             imgui.push_style_color(imgui.COLOR_TEXT, *red)
             right_text('New version available!')
             imgui.pop_style_color()
@@ -408,6 +470,8 @@ class MyApp(App):
         # automation tools
         with collapsing_header('Automation') as open:
             if open:
+                toggles = self.config.auto_fa, self.config.auto_da, self.config.auto_gear, self.config.auto_lights, self.config.auto_night_vision
+
                 self.config.active = colored_switch('Active', self.config.active)
                 imgui.same_line()
                 self.config.auto_fa = colored_switch('Flight Assist', self.config.auto_fa)
@@ -419,20 +483,52 @@ class MyApp(App):
                 self.config.auto_lights = colored_switch('Lights', self.config.auto_lights)
                 imgui.same_line()
                 self.config.auto_night_vision = colored_switch('Night Vision', self.config.auto_night_vision)
+
+                if toggles != (self.config.auto_fa, self.config.auto_da, self.config.auto_gear, self.config.auto_lights, self.config.auto_night_vision):
+                    self.automation.compile_rules()
                 imgui.separator()
 
                 # debug ui I guess
-                yes_no(self.state.docked_or_landed, 'Docked/Landed')
-                yes_no(self.was_docked_or_landed, 'Was Docked/Landed')
-                yes_no(self.state.fsd_active, 'FSD Active')
-                yes_no(self.state.in_srv, 'In SRV')
+                yes_no(self.automation.state.docked_or_landed, 'Docked/Landed')
+                yes_no(self.automation.was_docked_or_landed, 'Was Docked/Landed')
+                yes_no(self.automation.state.fsd_active, 'FSD Active')
+                yes_no(self.automation.state.in_srv, 'In SRV')
                 imgui.separator()
 
-                yes_no(self.state.drive_assist, 'Drive Assist', 'Enabled', 'Disabled')
-                yes_no(self.state.flight_assist, 'Flight Assist', 'Enabled', 'Disabled')
-                yes_no(self.state.gear, 'Gear', 'Extended', 'Retracted')
-                yes_no(self.state.lights, 'Lights', 'On', 'Off')
-                yes_no(self.state.night_vision, 'Night vision', 'On', 'Off')
+                yes_no(self.automation.state.drive_assist, 'Drive Assist', 'Enabled', 'Disabled')
+                yes_no(self.automation.state.flight_assist, 'Flight Assist', 'Enabled', 'Disabled')
+                yes_no(self.automation.state.gear, 'Gear', 'Extended', 'Retracted')
+                yes_no(self.automation.state.lights, 'Lights', 'On', 'Off')
+                yes_no(self.automation.state.night_vision, 'Night vision', 'On', 'Off')
+                imgui.separator()
+
+                tracker = self.automation.tracker
+                imgui.text(f'Key press confirmation: p50 {tracker.latency.percentile(.5) * 1e3:.0f}ms, '
+                           f'p95 {tracker.latency.percentile(.95) * 1e3:.0f}ms')
+                imgui.text(f'Confirmed: {tracker.confirmed}, retried: {tracker.retries}, failed: {tracker.failures}')
+
+        # diagnostics
+        with collapsing_header('Diagnostics') as open:
+            if open:
+                imgui.align_text_to_frame_padding()
+                imgui.text_disabled(f'Timings over the last {RING_SIZE} calls (p50, p95, max, all-time max)')
+                if right_button('Export JSON', 'diagnostics'):
+                    self._export_diagnostics()
+
+                for name, timing in TIMINGS.items():
+                    if timing.count:
+                        imgui.text(f'{name}: {timing.percentile(.5) * 1e3:.2f}ms, {timing.percentile(.95) * 1e3:.2f}ms, '
+                                   f'{timing.max * 1e3:.2f}ms, {timing.all_time_max * 1e3:.2f}ms ({timing.recorded} calls)')
+
+                pacer = self.frame_pacer
+                imgui.text(f'Frame pacing: {pacer.pace.value}, {pacer.frames} frames, {pacer.waited:.0f}s waited')
+
+                imgui.separator()
+                for file, metrics in self.watchdog.metrics.items():
+                    text = f'{file}: {metrics.events} events, {metrics.reads} reads, {metrics.changes} changes'
+                    if metrics.lag.count:
+                        text = f'{text}, lag {metrics.lag.percentile(.5) * 1e3:.1f}ms (p95 {metrics.lag.percentile(.95) * 1e3:.1f}ms)'
+                    imgui.text(text)
 
         # waypoint manager
         with collapsing_header('Waypoint Manager') as open:
@@ -440,11 +536,13 @@ class MyApp(App):
                 if self.current_waypoint is not None:
                     bearing_text = '[Unavailable]'
                     distance_text = '[Unavailable]'
-                    if self.has_position and self.current_waypoint.planet == self.planet_name:
-                        bearing = calculate_bearing(self.position, self.current_waypoint)
+                    if self.has_position and self.current_waypoint.planet == self.planet_name and (predicted := self.motion.predict(time.time())) is not None:
+                        # where we are by now, not at the last status update
+                        position, altitude = predicted.position, predicted.altitude
+                        bearing = calculate_bearing(position, self.current_waypoint)
 
-                        alt_distance = calculate_distance(self.position, self.current_waypoint.position, self.planet_radius + self.altitude)
-                        surf_distance = calculate_distance(self.position, self.current_waypoint.position, self.planet_radius)
+                        alt_distance = calculate_distance(position, self.current_waypoint.position, self.planet_radius + altitude)
+                        surf_distance = calculate_distance(position, self.current_waypoint.position, self.planet_radius)
 
                         eta = 'N/A'
                         if (v := self.recent_average_velocity) is not None and 0.0 < v:
@@ -480,13 +578,48 @@ class MyApp(App):
                     imgui.text(f'Current position: {lat:.4f}, {lon:.4f}')
                     imgui.same_line()
                     if right_button('Save'):
-                        name = find_first_available(WAYPOINT_NAME_PATTERN, lambda name: any(p.name == name for p in self.waypoints))
-                        self.waypoints.append(Waypoint.from_position(name, self.planet_name, lat, lon))
-                        self._filter_waypoints()
+                        name = self.waypoints.new_name(WAYPOINT_NAME_PATTERN)
+                        self.waypoints.add(Waypoint.from_position(name, self.planet_name, lat, lon))
                 else:
                     imgui.align_text_to_frame_padding()
                     imgui.text('Current position: [No Reading]')
 
+                imgui.align_text_to_frame_padding()
+                imgui.text(f'Current body: {self.current_body or "[None]"}')
+
+                if (error := self.motion.error).count:
+                    imgui.text_disabled(f'Prediction error: p50 {error.percentile(.5):.1f}m, p95 {error.percentile(.95):.1f}m '
+                                        f'(without: p95 {self.motion.hold_error.percentile(.95):.1f}m)')
+
+                if (nearest := self.nearest_waypoint) is not None:
+                    distance, waypoint = nearest
+                    imgui.align_text_to_frame_padding()
+                    imgui.text(f'Nearest waypoint: {waypoint.name} ({Float(distance):.2h}m)')
+                    if right_button('Target', 'nearest_waypoint'):
+                        self.current_waypoint = waypoint
+
+                # route
+                if self._route_planner is not None:
+                    imgui.align_text_to_frame_padding()
+                    imgui.text('Route: [Planning]')
+                elif (route := self.route) is not None:
+                    imgui.align_text_to_frame_padding()
+                    if route.done:
+                        imgui.text(f'Route: all {len(route.stops)} stops visited')
+                    else:
+                        imgui.text(f'Route: stop {route.index + 1}/{len(route.stops)}, {Float(route.remaining):.2h}m after this one')
+                    if right_button('Clear', 'route'):
+                        self.route = None
+                elif self.has_position:
+                    imgui.align_text_to_frame_padding()
+                    imgui.text('Route: [None]')
+                    if right_button('Plan', 'route'):
+                        self._plan_route()
+                    if imgui.is_item_hovered(ImGuiHoveredFlags_DelayShort):
+                        imgui.begin_tooltip()
+                        imgui.text('Visit every waypoint on this planet matching the filter')
+                        imgui.end_tooltip()
+
                 # waypoint list
                 imgui.separator()
                 with collapsing_header('Waypoints') as open:
@@ -525,6 +658,11 @@ class MyApp(App):
                             if not self.config.filter_current_planet:
                                 _, self.config.group_by_planet = imgui.checkbox('Group by planet', self.config.group_by_planet)
 
+                            _, self.config.sort_by_distance = imgui.checkbox('Sort by distance', self.config.sort_by_distance)
+
+                            _, self.config.arrival_distance = imgui.input_float('Route arrival distance (m)', self.config.arrival_distance, 10.0)
+                            self.config.arrival_distance = max(self.config.arrival_distance, 1.0)
+
                             change |= ratio_change | planet_change | seconds_change
                             imgui.end_popup()
 
@@ -533,39 +671,72 @@ class MyApp(App):
 
                         imgui.separator()
 
-                        if self.config.filter_current_planet or not self.config.group_by_planet:
-                            waypoints = sorted(self.filtered_waypoints, key=lambda x: x.name)
-                            empty = 0 == len(waypoints)
-
-                            for waypoint in waypoints:
-                                waypoint_panel(waypoint)
-                        else:
-                            planet_waypoints = dict(self.filtered_waypoints_by_planet)
-                            empty = 0 == len(planet_waypoints)
-
-                            for planet in sorted(planet_waypoints):
-                                if imgui.tree_node(planet):
-                                    for waypoint in sorted(planet_waypoints[planet], key=lambda x: x.name):
-                                        waypoint_panel(waypoint)
-                                    imgui.tree_pop()
+                        views = self.waypoint_views
+                        views.refresh(measurements if self.config.sort_by_distance else None)
+                        grouped = self.config.group_by_planet and not self.config.filter_current_planet
+                        rows = views.rows if grouped else views.sorted
 
-                        if empty:
+                        if 0 == len(rows):
                             imgui.text('No waypoints found')
+                        else:
+                            # only emit the rows in view, all of them are one frame high
+                            row_height = imgui.get_frame_height_with_spacing()
+                            height = max(imgui.get_content_region_available()[1], WAYPOINT_LIST_MIN_ROWS * row_height)
+                            imgui.begin_child('waypoint_list', 0, height)
+
+                            top = imgui.get_cursor_pos_y()
+                            scroll = imgui.get_scroll_y()
+                            first = min(max(int(scroll / row_height), 0), len(rows))
+                            last = min(int((scroll + imgui.get_window_height()) / row_height) + 1, len(rows))
+
+                            imgui.set_cursor_pos_y(top + first * row_height)
+                            for row in rows[first:last]:
+                                if isinstance(row, Waypoint):
+                                    if grouped:
+                                        # tree nodes don't push, their header might not have been emitted
+                                        imgui.indent()
+                                        waypoint_panel(row)
+                                        imgui.unindent()
+                                    else:
+                                        waypoint_panel(row)
+                                else:
+                                    imgui.align_text_to_frame_padding()
+                                    imgui.set_next_item_open(row in views.open_planets)
+                                    views.set_open(row, imgui.tree_node(row, imgui.TREE_NODE_NO_TREE_PUSH_ON_OPEN))
+
+                            # reserve the space of the rows below
+                            imgui.set_cursor_pos_y(top + len(rows) * row_height)
+                            imgui.dummy(0, 0)
+                            imgui.end_child()
 
     def on_start(self):
+        self._toggle_flight_recorder(self.config.flight_recorder)
+        self.automation.start()
+        self.window_tracker.start()
         self.watchdog.start()
 
     def on_stop(self):
         self.watchdog.stop()
+        self.journal.close()
+        self.window_tracker.stop()
+        self.automation.stop()
+        self._toggle_status_recording(False)
+        self._toggle_flight_recorder(False)
         Config.save(MyConfig, CONFIG_FILE, self.config)
-        with open(WAYPOINT_FILE, 'w') as wpf:
-            json.dump(self.waypoints, wpf, default=lambda x: x.__dict__)
+        self.waypoint_store.close()
 
     def on_hide(self):
         self.config.start_minimized = True
+        self.frame_pacer.hide()
 
     def on_show(self):
         self.config.start_minimized = False
+        self.frame_pacer.show()
+
+    def exit(self):
+        # update might be waiting for the window to show up again
+        self.frame_pacer.stop()
+        super().exit()
 
     def on_move(self, pos: (int, int)):
         self.config.window_position = pos
@@ -573,20 +744,124 @@ class MyApp(App):
     def get_additional_imgui_flags(self) -> int:
         return imgui.WINDOW_MENU_BAR
 
-    def _filter_waypoints(self):
-        self.filtered_waypoints = list(filter(self._filter_waypoint, self.waypoints))
-        self.filtered_waypoints_by_planet.clear()
+    def _toggle_status_recording(self, recording: bool):
+        if recording and self.status_recorder is None:
+            self.status_recorder = StatusRecorder(time.strftime(RECORDING_FILE_PATTERN))
+            LOGGER.info(f'Recording status updates to {self.status_recorder.path}')
+        elif not recording and (recorder := self.status_recorder) is not None:
+            self.status_recorder = None
+            recorder.close()
+
+    def _toggle_flight_recorder(self, recording: bool):
+        if recording and self.flight_recorder is None:
+            self.flight_recorder = FlightRecorder(time.strftime(FLIGHT_DIR_PATTERN))
+            LOGGER.info(f'Recording flight to {self.flight_recorder.path}')
+        elif not recording and (recorder := self.flight_recorder) is not None:
+            self.flight_recorder = None
+            recorder.close()
+
+    def diagnostics(self) -> dict:
+        """
+        @return: timings and counters of the hot paths, see Diagnostics header
+        """
+        tracker = self.automation.tracker
+        return {
+            'timings': {name: timing.to_json() for name, timing in TIMINGS.items()},
+            'watchdog': {file: metrics.to_json() for file, metrics in self.watchdog.metrics.items()},
+            'input': {'presses': self.automation.input.presses, 'batches': self.automation.input.batches},
+            'key_confirmation': {
+                'latency': tracker.latency.to_json(),
+                'confirmed': tracker.confirmed,
+                'retries': tracker.retries,
+                'failures': tracker.failures,
+            },
+        }
+
+    def _export_diagnostics(self):
+        path = time.strftime(DIAGNOSTICS_FILE_PATTERN)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.diagnostics(), f, indent=2)
+        except OSError as e:
+            LOGGER.error(f'Failed to export diagnostics: {e}')
+            return
+        LOGGER.info(f'Exported diagnostics to {path}')
+
+    def _import_waypoints(self):
+        # pulls in tkinter, only load it when it's needed
+        import easygui
+
+        path = easygui.fileopenbox('Import waypoints', filetypes=[f'*{extension}' for extension in FORMATS])
+        if path is None:
+            return
 
-        for waypoint in self.filtered_waypoints:
-            self.filtered_waypoints_by_planet[waypoint.planet].append(waypoint)
+        def run():
+            try:
+                # one journal flush per batch instead of per waypoint
+                with self.waypoint_store.batch():
+                    report = import_waypoints(path, self.waypoints)
+            except (OSError, ValueError) as e:
+                LOGGER.error(f'Failed to import waypoints from {path}: {e}')
+                return
+            finally:
+                self._importer = None
+                self._waypoints_changed = True
+
+            LOGGER.info(f'Imported waypoints from {path}: {report.summary()}')
+            for row, error in report.errors:
+                LOGGER.warning(f'{path}, row {row}: {error}')
+
+        self._importer = threading.Thread(target=run, name='WaypointImporter', daemon=True)
+        self._importer.start()
+
+    def _export_waypoints(self):
+        import easygui
+
+        path = easygui.filesavebox('Export waypoints', default='waypoints.geojson', filetypes=[f'*{extension}' for extension in FORMATS])
+        if path is None:
+            return
+
+        try:
+            n = export_waypoints(path, self.waypoints)
+        except (OSError, ValueError) as e:
+            LOGGER.error(f'Failed to export waypoints to {path}: {e}')
+            return
+
+        LOGGER.info(f'Exported {n} waypoints to {path}')
 
-    def _filter_waypoint(self, waypoint: Waypoint) -> bool:
-        if self.config.filter_current_planet and self.has_position:
-            if self.planet_name != waypoint.planet:
-                return False
+    def _plan_route(self):
+        planet, position, radius = self.planet_name, self.position, self.planet_radius
+        stops = self.waypoint_search.search(self.config.waypoint_filter, self.config.fuzzy_ratio, planet)
 
-        if self.config.waypoint_filter == '':
-            return True
+        if not stops:
+            LOGGER.info('No waypoints to plan a route through')
+            return
 
-        r = partial_ratio(self.config.waypoint_filter.lower(), f'{waypoint.name} {waypoint.planet}'.lower())
-        return self.config.fuzzy_ratio <= r
+        def plan():
+            try:
+                route = plan_route(position, stops, radius, self.route_matrix)
+                LOGGER.info(f'Planned route through {len(route.stops)} waypoints, {Float(sum(route.legs)):.2h}m')
+                self.route = route
+                self.current_waypoint = route.current
+            finally:
+                self._route_planner = None
+
+        self._route_planner = threading.Thread(target=plan, name='RoutePlanner', daemon=True)
+        self._route_planner.start()
+
+    def _check_arrival(self):
+        """
+        Moves on to the next stop of the route once we are close enough to the current one
+        """
+        route, target = self.route, self.current_waypoint
+        if route is None or target is None or target != route.current or target.planet != self.planet_name:
+            return
+
+        if calculate_distance(self.position, target.position, self.planet_radius) <= self.config.arrival_distance:
+            self.current_waypoint = route.advance()
+            LOGGER.info(f'Arrived at {target.name}, next: {self.current_waypoint.name if self.current_waypoint else "[Done]"}')
+
+    @timed('filter_waypoints')
+    def _filter_waypoints(self):
+        planet = self.planet_name if self.config.filter_current_planet and self.has_position else None
+        self.waypoint_views.set(self.waypoint_search.search(self.config.waypoint_filter, self.config.fuzzy_ratio, planet))
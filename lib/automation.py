@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""
+Automation logic deciding which key binds to press
+
+Kept free of any gui code, so it can be driven headless
+(see lib.replay)
+
+@author Kami-Kaze
+"""
+
+import threading
+
+from lib.globals import *
+from lib.input import InputDispatcher
+from lib.acknowledge import PressTracker
+from lib.rules import CompiledRule, RuleTable, WAS_DOCKED_OR_LANDED
+from lib.ship_state import ShipState
+
+
+class Automation:
+    """
+    Event driven: decisions are made when a new status arrives, the game
+    window gains focus or a press went unconfirmed, never per frame
+    """
+
+    def __init__(self, config):
+        """
+        @param config: object providing the active and auto_* toggles, user rules
+                       and min_press_spacing (usually MyConfig)
+        """
+        self.config = config
+        self.input = InputDispatcher(config.min_press_spacing)
+        self.state = ShipState()
+        # whether the key binds for the current state have been handled
+        self.processed = True
+        # nothing to handle until the first status arrives
+        self.has_status = False
+        # synthetic flags (see lib.rules), or-ed to the game's flags
+        self.synthetic_flags = 0
+        self.rules = RuleTable.from_config(config)
+
+        self.tracker = PressTracker(self._press, self._on_press_timeout)
+
+        self.focused = False
+        # whether the window has been focused for at least FOCUS_DELAY
+        self._focus_settled = False
+        self._focus_generation = 0
+        self._focus_timer: threading.Timer or None = None
+
+        # status updates arrive on the watchdog thread, focus changes on the window tracker
+        # thread and timeouts on a timer thread
+        self._lock = threading.RLock()
+
+    @property
+    def was_docked_or_landed(self) -> bool:
+        return bool(self.synthetic_flags & WAS_DOCKED_OR_LANDED)
+
+    def compile_rules(self):
+        """
+        Recompiles the rule table, call after changing the config
+        """
+        rules = RuleTable.from_config(self.config)
+        with self._lock:
+            self.rules = rules
+
+    def on_focus_change(self, focused: bool):
+        if focused == self.focused:
+            return
+
+        with self._lock:
+            self.focused = focused
+            self._focus_settled = False
+            self._focus_generation += 1
+
+            if self._focus_timer is not None:
+                self._focus_timer.cancel()
+                self._focus_timer = None
+
+            if focused:
+                # the game drops presses while it's still busy getting focus, a press lost anyway is retried
+                self._focus_timer = threading.Timer(FOCUS_DELAY, self._on_focus_settled, (self._focus_generation,))
+                self._focus_timer.daemon = True
+                self._focus_timer.start()
+            else:
+                # the game won't see anything we press now, nor whatever is still queued
+                self.tracker.clear()
+                self.input.clear()
+
+    def on_status_update(self, flags: int):
+        with self._lock:
+            self.state = state = self.state.next(flags)
+            for rule in self.tracker.on_state(state):
+                self.synthetic_flags &= ~rule.resets
+
+            self.processed = False
+            self.has_status = True
+            if state.docked_or_landed:
+                self.synthetic_flags |= WAS_DOCKED_OR_LANDED
+            self.evaluate()
+
+    def evaluate(self):
+        """
+        Presses whatever key binds the current state needs, at most once per state
+        and never while an earlier press for the same flag awaits confirmation
+        """
+        with self._lock:
+            if not self._focus_settled or not self.has_status or not self.config.active or self.processed:
+                return
+
+            for rule in self.rules.matches(self.state.flags | self.synthetic_flags):
+                if self.tracker.request(rule):
+                    LOGGER.debug(rule.name)
+
+            self.processed = True
+
+    def start(self):
+        self.input.start()
+
+    def stop(self):
+        with self._lock:
+            if self._focus_timer is not None:
+                self._focus_timer.cancel()
+                self._focus_timer = None
+
+        self.tracker.stop()
+        self.input.stop()
+
+    def _on_focus_settled(self, generation: int):
+        with self._lock:
+            # focus changed again while we were waiting
+            if generation != self._focus_generation:
+                return
+
+            self._focus_timer = None
+            self._focus_settled = True
+            self.processed = False
+            self.evaluate()
+
+    def _press(self, rule: CompiledRule):
+        self.input.press(rule.key, *rule.mods)
+
+    def _on_press_timeout(self):
+        with self._lock:
+            self.processed = False
+            self.evaluate()
@@ -52,18 +52,36 @@ class Status(IntFlag):
     SRV_HIGH_BEAM = _bit(31)
 
 
+class Masks:
+    """
+    Composite masks of Status flags,
+    plain ints since IntFlag arithmetic is a lot slower
+    """
+    DOCKED_OR_LANDED = int(Status.DOCKED | Status.LANDED)
+    FSD_ACTIVE = int(Status.FSD_CHARGING | Status.SUPER_CRUISE | Status.FSD_JUMP)
+    FLIGHT_ASSIST_OFF = int(Status.FLIGHT_ASSIST_OFF)
+    SRV_DRIVE_ASSIST = int(Status.SRV_DRIVE_ASSIST)
+    GEAR_DOWN = int(Status.GEAR_DOWN)
+    IN_SRV = int(Status.IN_SRV)
+    LIGHTS_ON = int(Status.LIGHTS_ON)
+    NIGHT_VISION = int(Status.NIGHT_VISION)
+    HAS_LAT_LONG = int(Status.HAS_LAT_LONG)
+
+
 # noinspection SpellCheckingInspection
 class Files:
     STATUS = "Status.json"
-    SHIP_YARD = "Shipjard.json"
+    SHIP_YARD = "Shipyard.json"
     SHIP_LOCKER = "ShipLocker.json"
-    OUTFITTING = "Outfittin.json"
+    OUTFITTING = "Outfitting.json"
     NAV_ROUTE = "NavRoute.json"
     MODULE_INFO = "ModulesInfo.json"
     MARKET = "Market.json"
     CARGO = "Cargo.json"
     BACKPACK = "Backpack.json"
+    JOURNAL_PATTERN = "Journal.*.log"
 
 
-BasePath = os.path.join(os.getenv('USERPROFILE'), r'Saved Games\Frontier Developments\Elite Dangerous')
+# fall back to the home directory so the module can be imported on systems without USERPROFILE (e.g. replays on linux)
+BasePath = os.path.join(os.getenv('USERPROFILE', os.path.expanduser('~')), r'Saved Games\Frontier Developments\Elite Dangerous')
 WindowName = "Elite - Dangerous (CLIENT)"
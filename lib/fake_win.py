@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""
+Fake window/input backend standing in for lib.win
+
+Lets the automation path run without win32 (e.g. replaying status
+recordings on a headless linux box). Nothing is sent anywhere, key presses
+are only recorded in `presses`.
+
+Call install() before anything imports lib.globals (or lib.win)
+
+@author Kami-Kaze
+"""
+
+import sys
+import threading
+import time
+from typing import Callable
+
+from lib import ed
+
+# subset of the virtual key codes from lib.win needed for the key binds in lib.globals
+VK_SHIFT = 0x10
+VK_RSHIFT = 0xA1
+VK_F5 = 0x74
+VK_F6 = 0x75
+VK_F7 = 0x76
+VK_F8 = 0x77
+VK_F9 = 0x78
+
+W_HNDL = int or None
+
+# fake window state, tweak these to simulate ED being closed/unfocused
+window_open = True
+focused = True
+
+# (perf_counter timestamp, key, mods) of every key press
+presses: list[tuple[float, int, tuple[int, ...]]] = []
+# (perf_counter timestamp, compiled presses) of every (fake) SendInput call
+batches: list[tuple[float, tuple]] = []
+on_press: Callable[[int, tuple[int, ...]], None] or None = None
+
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_OBJECT_DESTROY = 0x8001
+
+_HNDL = 1
+_OTHER_HNDL = 2
+
+# thread id -> (callback, stop event) of running run_window_events loops
+_event_loops: dict[int, tuple[Callable[[int, W_HNDL], None], threading.Event]] = {}
+# thread id -> window whose destruction the loop reports, see watch_window
+_watched: dict[int, W_HNDL] = {}
+
+
+def install():
+    """
+    Registers this module as lib.win
+    """
+    import lib
+
+    module = sys.modules[__name__]
+    sys.modules['lib.win'] = module
+    lib.win = module
+
+
+def reset():
+    global window_open, focused, on_press
+    window_open = True
+    focused = True
+    on_press = None
+    presses.clear()
+    batches.clear()
+
+
+def set_focused(value: bool):
+    """
+    Focuses (or un-focuses) the fake window and pushes the foreground event
+    """
+    global focused
+    focused = value
+    _push(EVENT_SYSTEM_FOREGROUND, _HNDL if window_open and focused else _OTHER_HNDL)
+
+
+def close_window():
+    global window_open
+    window_open = False
+    _push(EVENT_OBJECT_DESTROY, _HNDL)
+
+
+def _push(event: int, hndl: W_HNDL):
+    for thread_id, (callback, _) in list(_event_loops.items()):
+        # like the real hook, destroy events only come in for the watched window
+        if event != EVENT_OBJECT_DESTROY or _watched.get(thread_id) == hndl:
+            callback(event, hndl)
+
+
+def scan_code(key):
+    return key
+
+
+def compile_keys(key, *mods):
+    return key, mods
+
+
+def send_compiled(*compiled):
+    t = time.perf_counter()
+    batches.append((t, compiled))
+    for key, mods in compiled:
+        presses.append((t, key, mods))
+        if on_press is not None:
+            on_press(key, mods)
+    # SendInput returns the number of events inserted
+    return sum(2 + 2 * len(mods) for _, mods in compiled)
+
+
+def press_key(key, *mods):
+    return send_compiled(compile_keys(key, *mods))
+
+
+def find_window(name: str) -> W_HNDL:
+    return _HNDL if window_open else None
+
+
+def get_active_window() -> W_HNDL:
+    return _HNDL if window_open and focused else None
+
+
+def is_window_focused(hndl: W_HNDL) -> bool:
+    return False if hndl is None else hndl == get_active_window()
+
+
+def get_window_text(hndl: W_HNDL) -> str:
+    return ed.WindowName if hndl == _HNDL and window_open else ''
+
+
+def run_window_events(callback: Callable[[int, W_HNDL], None], ready: Callable[[int], None]):
+    thread_id = threading.get_ident()
+    stop = threading.Event()
+    _event_loops[thread_id] = callback, stop
+    try:
+        ready(thread_id)
+        stop.wait()
+    finally:
+        del _event_loops[thread_id]
+        _watched.pop(thread_id, None)
+
+
+def watch_window(thread_id: int, hndl: W_HNDL):
+    _watched[thread_id] = hndl
+    if hndl is not None and not window_open and (loop := _event_loops.get(thread_id)) is not None:
+        # destroyed before the hook was in place
+        loop[0](EVENT_OBJECT_DESTROY, hndl)
+
+
+def stop_window_events(thread_id: int):
+    if (loop := _event_loops.get(thread_id)) is not None:
+        loop[1].set()
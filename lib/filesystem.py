@@ -4,52 +4,343 @@
 
 @author Kami-Kaze
 """
+import fnmatch
+import hashlib
 import io
 import os
+import threading
+import time
+from dataclasses import dataclass, field
 from typing import Callable
 
-from watchdog.events import PatternMatchingEventHandler
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
 
+from lib.metrics import RingHistogram
 
-class Handler(PatternMatchingEventHandler):
-    def __init__(self, path: str, file: str, callback: Callable[[bytes], None], ignore_empty: bool = True):
-        super().__init__({file})
+# one write by the game often fires several modified events, wait this long (s) for them to settle
+DEFAULT_COALESCE_WINDOW = .005
+# file timestamps only move in ticks (~15.6ms on windows), a write within the tick of our last read keeps the mtime (s)
+MTIME_GRANULARITY = .05
+
+
+@dataclass
+class WatchMetrics:
+    # file system events received
+    events: int = 0
+    # times the file was actually read
+    reads: int = 0
+    # reads skipped as size and mtime matched a read made well after that mtime
+    unchanged_stat: int = 0
+    # reads where the content matched the last read
+    unchanged_content: int = 0
+    # payloads passed on to the callback, one per real change
+    changes: int = 0
+    # seconds from the file being written (its mtime) to passing it on
+    lag: RingHistogram = field(default_factory=RingHistogram)
+
+    def to_json(self) -> dict:
+        return {
+            'events': self.events,
+            'reads': self.reads,
+            'unchanged_stat': self.unchanged_stat,
+            'unchanged_content': self.unchanged_content,
+            'changes': self.changes,
+            'lag': self.lag.to_json(),
+        }
+
+
+class _Settler:
+    """
+    One long lived thread reading handlers once the events of a burst settled,
+    instead of a timer (and thread) per burst
+    """
+
+    def __init__(self):
+        # handler -> when to read it (monotonic)
+        self._due: dict['Handler', float] = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread: threading.Thread or None = None
+
+    def start(self):
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='WatchdogReader', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def schedule(self, handler: 'Handler', delay: float):
+        """
+        Reads handler after delay, unless it's already due, that read will pick this change up as well
+        """
+        with self._condition:
+            if handler not in self._due:
+                self._due[handler] = time.monotonic() + delay
+                self._condition.notify()
+
+    def cancel(self, handler: 'Handler'):
+        with self._condition:
+            self._due.pop(handler, None)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if not self._due:
+                        self._condition.wait()
+                    elif (timeout := min(self._due.values()) - time.monotonic()) > 0:
+                        self._condition.wait(timeout)
+                    else:
+                        break
+                if self._stopped:
+                    return
+
+                now = time.monotonic()
+                ready = [handler for handler, deadline in self._due.items() if deadline <= now]
+                for handler in ready:
+                    del self._due[handler]
+
+            for handler in ready:
+                handler.read()
+
+
+class Handler:
+    """
+    Reads a single file whenever it changed and passes the content to callback
+    """
+
+    def __init__(self, path: str, file: str, callback: Callable[[bytes], None], settler: _Settler, ignore_empty: bool = True,
+                 coalesce_window: float = DEFAULT_COALESCE_WINDOW):
         self.path = os.path.join(path, file)
         self.ignore_empty = ignore_empty
         self.callback = callback
+        self.coalesce_window = coalesce_window
+        self.metrics = WatchMetrics()
         self.file: io.FileIO = None
+        self.settler = settler
 
-    def on_modified(self, *_):
+        self._buffer = bytearray(4096)
+        # (size, mtime) of the last read, only set once a read came MTIME_GRANULARITY after the mtime
+        self._last_stat: tuple[int, int] or None = None
+        self._last_digest: bytes or None = None
+        # the file at path was replaced, our fd still points to the old one
+        self._replaced = False
+        self._read_lock = threading.Lock()
+
+    def on_modified(self, replaced: bool = False):
+        """
+        @param replaced: a new file took the place of the one we have open (created or renamed onto path)
+        """
+        self.metrics.events += 1
+        if self.file is not None:
+            if replaced:
+                self._replaced = True
+            self.settler.schedule(self, self.coalesce_window)
+
+    def open(self):
+        self.file = open(self.path, 'rb', buffering=0)
+        self.read()
+
+    def close(self):
+        self.settler.cancel(self)
+        with self._read_lock:
+            self.file.close()
+            self.file = None
+
+    def read(self):
+        # a new burst might settle while we are still busy with the last one
+        with self._read_lock:
+            if self.file is not None:
+                self._read_locked()
+
+    def _read_locked(self):
+        if self._replaced:
+            try:
+                file = open(self.path, 'rb', buffering=0)
+            except OSError:
+                # gone again, keep the old one until the next event
+                return
+            self.file.close()
+            self.file = file
+            self._replaced = False
+            self._last_stat = None
+
+        stat = os.fstat(self.file.fileno())
+        key = stat.st_size, stat.st_mtime_ns
+        if key == self._last_stat:
+            self.metrics.unchanged_stat += 1
+            return
+        # within the timestamp's granularity a later write of the same size could still keep the mtime, read and hash until then
+        self._last_stat = key if time.time_ns() - stat.st_mtime_ns > MTIME_GRANULARITY * 1e9 else None
+
+        # the file might grow between stat and read, leave some room
+        if len(self._buffer) <= stat.st_size:
+            self._buffer = bytearray(max(stat.st_size * 2, len(self._buffer) * 2))
+
+        self.metrics.reads += 1
+        view = memoryview(self._buffer)
         self.file.seek(0)
-        raw_json = self.file.read()
-        if not raw_json and self.ignore_empty:
+        size = 0
+        while size < len(view) and (n := self.file.readinto(view[size:])):
+            size += n
+
+        if not size and self.ignore_empty:
             return
 
-        self.callback(raw_json)
+        raw_json = view[:size]
+        digest = hashlib.blake2b(raw_json, digest_size=16).digest()
+        if digest == self._last_digest:
+            self.metrics.unchanged_content += 1
+            return
+        self._last_digest = digest
+
+        self.metrics.changes += 1
+        # clocks of the file system and ours might be a bit apart
+        self.metrics.lag.record(max(time.time_ns() - stat.st_mtime_ns, 0) / 1e9)
+        self.callback(bytes(raw_json))
+
+
+class PatternHandler:
+    """
+    Passes the name of any file matching pattern that was created or modified to callback,
+    reading is up to the callback (e.g. a JournalTailer)
+    """
+
+    def __init__(self, pattern: str, callback: Callable[[str or None], None]):
+        self.pattern = pattern
+        self.callback = callback
+        self.metrics = WatchMetrics()
+
+        # callback is never called concurrently
+        self._lock = threading.Lock()
+        self._catch_up: threading.Thread or None = None
+
+    def on_modified(self, file: str):
+        self.metrics.events += 1
+        with self._lock:
+            self.metrics.changes += 1
+            self.callback(file)
 
     def open(self):
-        self.file = open(self.path)
-        self.on_modified()
+        # catch up on whatever happened while we were not watching, without a checkpoint that
+        # means reading a whole journal, so not on the calling (ui) thread
+        self._catch_up = threading.Thread(target=self._on_catch_up, name=f'CatchUp {self.pattern}', daemon=True)
+        self._catch_up.start()
 
     def close(self):
-        self.file.close()
+        if self._catch_up is not None:
+            self._catch_up.join()
+            self._catch_up = None
+
+    def _on_catch_up(self):
+        with self._lock:
+            self.callback(None)
+
+
+class _Dispatcher(FileSystemEventHandler):
+    """
+    Single event handler for a whole directory, routing events to the
+    registered handlers by file name (dict lookup) or pattern
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.files: dict[str, Handler] = {}
+        self.patterns: list[PatternHandler] = []
+
+    def on_created(self, event: FileSystemEvent):
+        if not event.is_directory:
+            self._dispatch(event.src_path, replaced=True)
+
+    def on_modified(self, event: FileSystemEvent):
+        if not event.is_directory:
+            self._dispatch(event.src_path)
+
+    def on_moved(self, event: FileSystemEvent):
+        # files replaced by renaming a temporary file onto them, the handler reopens them
+        if not event.is_directory:
+            self._dispatch(event.dest_path, replaced=True)
+
+    def _dispatch(self, path: str, replaced: bool = False):
+        file = os.path.basename(path)
+        if (handler := self.files.get(os.path.normcase(file))) is not None:
+            handler.on_modified(replaced)
+            return
+
+        for handler in self.patterns:
+            if fnmatch.fnmatch(file, handler.pattern):
+                handler.on_modified(file)
 
 
 class Watchdog:
-    def __init__(self, path: str, file: str, on_change: Callable[[bytes], None], ignore_empty: bool = True):
+    """
+    Watches a directory with a single observer (one OS watch, one thread),
+    no matter how many files in it are being watched. Files are read on a second,
+    long lived thread once a burst of events settled.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
         self.observer = Observer()
-        self.handler = Handler(path, file, on_change, ignore_empty)
-        self.observer.schedule(self.handler, path, recursive=False)
+        self.running = False
+        self._settler = _Settler()
+        self._dispatcher = _Dispatcher()
+        self.observer.schedule(self._dispatcher, path, recursive=False)
+
+    @property
+    def metrics(self) -> dict[str, WatchMetrics]:
+        """
+        @return: metrics by watched file name/pattern
+        """
+        return {
+            **{os.path.basename(handler.path): handler.metrics for handler in self._dispatcher.files.values()},
+            **{handler.pattern: handler.metrics for handler in self._dispatcher.patterns},
+        }
+
+    def watch(self, file: str, on_change: Callable[[bytes], None], ignore_empty: bool = True, coalesce_window: float = DEFAULT_COALESCE_WINDOW) -> Handler:
+        """
+        Calls on_change with the content of file whenever it changed
+        """
+        handler = Handler(self.path, file, on_change, self._settler, ignore_empty, coalesce_window)
+        self._dispatcher.files[os.path.normcase(file)] = handler
+        if self.running:
+            handler.open()
+        return handler
+
+    def watch_pattern(self, pattern: str, on_change: Callable[[str or None], None]) -> PatternHandler:
+        """
+        Calls on_change with the name of any file matching pattern whenever it was created or modified
+        """
+        handler = PatternHandler(pattern, on_change)
+        self._dispatcher.patterns.append(handler)
+        if self.running:
+            handler.open()
+        return handler
 
     def start(self):
-        self.handler.open()
+        self._settler.start()
+        for handler in self._handlers():
+            handler.open()
         self.observer.start()
+        self.running = True
 
     def stop(self):
+        self.running = False
         self.observer.stop()
         self.observer.join()
-        self.handler.close()
+        self._settler.stop()
+        for handler in self._handlers():
+            handler.close()
+
+    def _handlers(self) -> list[Handler or PatternHandler]:
+        return [*self._dispatcher.files.values(), *self._dispatcher.patterns]
 
     def __enter__(self):
         self.start()
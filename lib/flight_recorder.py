@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+"""
+Columnar recording of status telemetry
+
+A flight is a directory (see FLIGHT_DIR_PATTERN) with one file per column, each a plain
+little endian array of fixed width values, so the columns can be memory mapped as is:
+    t.f8          unix time of the sample
+    flags.u4      status flags
+    lat.f8        latitude (°), 0 without position
+    lon.f8        longitude (°)
+    heading.i2    heading (°)
+    altitude.f4   altitude (m)
+    radius.f4     planet radius (m)
+    body.u2       index into bodies.json, 0 for no body
+
+At 40 bytes per sample a few hours at a few updates per second stay at a few MB.
+
+@author Kami-Kaze
+"""
+
+import array
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from lib.globals import *
+from lib.status import StatusRecord
+
+# samples kept in memory before they are appended to the column files, a crash loses at most these
+CHUNK_SIZE = 256
+BODIES_FILE = 'bodies.json'
+
+# name, array typecode, numpy dtype
+COLUMNS = (
+    ('t', 'd', '<f8'),
+    ('flags', 'I', '<u4'),
+    ('lat', 'd', '<f8'),
+    ('lon', 'd', '<f8'),
+    ('heading', 'h', '<i2'),
+    ('altitude', 'f', '<f4'),
+    ('radius', 'f', '<f4'),
+    ('body', 'H', '<u2'),
+)
+
+
+def column_file(path: str, name: str, dtype: str) -> str:
+    return os.path.join(path, f'{name}.{dtype[1:]}')
+
+
+class FlightRecorder:
+    """
+    Appends status samples to a flight, record only copies a few numbers into
+    in memory buffers, the files are written once per CHUNK_SIZE samples
+    """
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.samples = 0
+
+        # body name -> index into bodies, '' is always 0
+        self.bodies: list[str] = ['']
+        self._body_ids: dict[str, int] = {'': 0}
+        self._bodies_changed = True
+
+        self._buffers = [array.array(typecode) for _, typecode, _ in COLUMNS]
+        self._files = [open(column_file(path, name, dtype), 'ab') for name, _, dtype in COLUMNS]
+        self._lock = threading.Lock()
+
+    def record(self, t: float, status: StatusRecord):
+        with self._lock:
+            if self._files is None:
+                return
+
+            if (body := self._body_ids.get(status.body_name)) is None:
+                body = self._body_ids[status.body_name] = len(self.bodies)
+                self.bodies.append(status.body_name)
+                self._bodies_changed = True
+
+            t_, flags, lat, lon, heading, altitude, radius, body_ = self._buffers
+            t_.append(t)
+            flags.append(status.flags)
+            lat.append(status.lat)
+            lon.append(status.lon)
+            heading.append(int(status.heading))
+            altitude.append(status.altitude)
+            radius.append(status.planet_radius)
+            body_.append(body)
+
+            self.samples += 1
+            if len(t_) >= self.chunk_size:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            if self._files is not None:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._files is None:
+                return
+            self._flush()
+            for f in self._files:
+                f.close()
+            self._files = None
+
+    def _flush(self):
+        if self._bodies_changed:
+            # before the samples referring to them
+            tmp = os.path.join(self.path, f'{BODIES_FILE}.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.bodies, f)
+            os.replace(tmp, os.path.join(self.path, BODIES_FILE))
+            self._bodies_changed = False
+
+        for buffer, f in zip(self._buffers, self._files):
+            if sys.byteorder == 'big':
+                buffer.byteswap()
+            buffer.tofile(f)
+            f.flush()
+            del buffer[:]
+
+
+class Flight:
+    """
+    Memory mapped flight for queries, samples recorded after opening it are not seen
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, BODIES_FILE), 'r', encoding='utf-8') as f:
+            self.bodies: list[str] = json.load(f)
+
+        columns = {}
+        for name, _, dtype in COLUMNS:
+            file = column_file(path, name, dtype)
+            # whole values only, a crash might have cut the last one
+            n = os.path.getsize(file) // np.dtype(dtype).itemsize
+            # np.memmap can't map empty files
+            columns[name] = np.memmap(file, dtype, 'r', shape=(n,)) if n else np.empty(0, dtype)
+
+        # a crash in the middle of a flush can leave the columns at different lengths
+        n = min(len(column) for column in columns.values())
+        self.columns: dict[str, np.ndarray] = {name: column[:n] for name, column in columns.items()}
+
+    def __len__(self) -> int:
+        return len(self.columns['t'])
+
+    def between(self, t0: float = None, t1: float = None) -> slice:
+        """
+        @return: samples with t0 <= t < t1, samples are in time order so this is a binary search
+        """
+        t = self.columns['t']
+        start = 0 if t0 is None else int(np.searchsorted(t, t0, 'left'))
+        stop = len(t) if t1 is None else int(np.searchsorted(t, t1, 'left'))
+        return slice(start, stop)
+
+    def query(self, t0: float = None, t1: float = None, body: str = None) -> dict[str, np.ndarray]:
+        """
+        @param body: only samples at this body
+        @return: column name -> values of the samples with t0 <= t < t1 (at body)
+        """
+        selected = self.between(t0, t1)
+        columns = {name: column[selected] for name, column in self.columns.items()}
+        if body is None:
+            return columns
+
+        if body not in self.bodies:
+            return {name: column[:0] for name, column in columns.items()}
+        mask = columns['body'] == self.bodies.index(body)
+        return {name: column[mask] for name, column in columns.items()}
+
+
+def list_flights(directory: str = FLIGHT_DIR) -> list[str]:
+    """
+    @return: paths of the recorded flights, oldest first
+    """
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names if os.path.isfile(os.path.join(directory, name, BODIES_FILE))]
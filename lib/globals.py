@@ -24,6 +24,10 @@ KEY_GEAR = win.scan_code(win.VK_F7)
 KEY_LIGHTS = win.scan_code(win.VK_F8)
 KEY_NIGHT_VISION = win.scan_code(win.VK_F9)
 
+# seems ED struggles if you send commands right after it got focus,
+# so we need to wait a bit (50ms) before going ham :)
+FOCUS_DELAY = .05
+
 # logging
 LOGGER = get_logger('main')
 
@@ -36,6 +40,13 @@ DATA_DIR = '.data'
 CONFIG_FILE = join_path(DATA_DIR, 'config.json')
 WAYPOINT_FILE = join_path(DATA_DIR, 'waypoints.json')
 WAYPOINT_BACKUP_PATTERN = join_path(DATA_DIR, 'waypoints-backup-%d.json')
+JOURNAL_CHECKPOINT_FILE = join_path(DATA_DIR, 'journal.json')
+VERSION_CACHE_FILE = join_path(DATA_DIR, 'version.json')
+RECORDING_DIR = join_path(DATA_DIR, 'recordings')
+RECORDING_FILE_PATTERN = join_path(RECORDING_DIR, 'status-%Y%m%d-%H%M%S.jsonl')
+FLIGHT_DIR = join_path(DATA_DIR, 'flights')
+FLIGHT_DIR_PATTERN = join_path(FLIGHT_DIR, 'flight-%Y%m%d-%H%M%S')
+DIAGNOSTICS_FILE_PATTERN = join_path(DATA_DIR, 'diagnostics-%Y%m%d-%H%M%S.json')
 LATEST_RELEASE = releases_url('Kaze-Kami', 'auto-ed', latest=True)
 STATUS_FILE_PATH = os.path.join(ed.BasePath, ed.Files.STATUS)
 
@@ -46,6 +57,8 @@ WAYPOINT_NAME_PATTERN = 'New Waypoint %d'
 BUTTON_PADDING = 5  # add this to a the calc_text_size of a button's text to get the buttons width
 DEFAULT_FUZZY_RATIO = 70
 DEFAULT_SECONDS_TO_AVERAGE = 5
+DEFAULT_ARRIVAL_DISTANCE = 100.0  # m
+WAYPOINT_LIST_MIN_ROWS = 8  # the waypoint list takes the rest of the window, but at least this many rows
 
 # not present in PyImGui -> taken from imgui source code
 ImGuiHoveredFlags_DelayShort = 1 << 12
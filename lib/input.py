@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+@author Kami-Kaze
+"""
+
+import queue
+import threading
+import time
+
+from lib import win
+from lib.metrics import timed
+
+DEFAULT_PRESS_SPACING = .02
+
+
+class InputDispatcher:
+    """
+    Sends key presses from a worker thread, so callers never block on SendInput.
+
+    INPUT arrays are compiled once per (key, mods) binding, presses queued while
+    the worker is busy (or waiting) go out together in a single SendInput call and
+    consecutive calls are at least min_spacing seconds apart. Order is preserved.
+    clear drops whatever was not sent yet.
+    """
+
+    def __init__(self, min_spacing: float = DEFAULT_PRESS_SPACING, backend=win):
+        """
+        @param backend: module providing compile_keys and send_compiled (lib.win or lib.fake_win)
+        """
+        self.min_spacing = min_spacing
+        self.backend = backend
+
+        # presses and SendInput calls sent so far
+        self.presses = 0
+        self.batches = 0
+
+        self._compiled: dict[tuple[int, tuple[int, ...]], object] = {}
+        # (generation, binding), presses of an earlier generation were cleared
+        self._queue: queue.SimpleQueue[tuple[int, tuple[int, tuple[int, ...]]] or None] = queue.SimpleQueue()
+        self._generation = 0
+        self._thread: threading.Thread or None = None
+        self._idle = threading.Event()
+        self._idle.set()
+        self._queued = 0
+        self._queued_lock = threading.Lock()
+        self._last_sent = 0.0
+
+    def press(self, key: int, *mods: int):
+        with self._queued_lock:
+            self._queued += 1
+            self._idle.clear()
+            self._queue.put((self._generation, (key, mods)))
+
+    def clear(self):
+        """
+        Drops every press not sent yet, e.g. when the window lost focus
+        """
+        with self._queued_lock:
+            self._generation += 1
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """
+        Waits until every queued press was sent
+        """
+        return self._idle.wait(timeout)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='InputDispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _compile(self, binding: tuple[int, tuple[int, ...]]):
+        if (compiled := self._compiled.get(binding)) is None:
+            key, mods = binding
+            compiled = self._compiled[binding] = self.backend.compile_keys(key, *mods)
+        return compiled
+
+    def _drain(self, pending: list) -> bool:
+        """
+        Moves everything queued into pending
+
+        @return: False if we were asked to stop
+        """
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return True
+            if entry is None:
+                return False
+            pending.append(entry)
+
+    @timed('press_key')
+    def _send(self, pending: list):
+        self.backend.send_compiled(*map(self._compile, pending))
+
+    def _run(self):
+        running = True
+        while running:
+            entry = self._queue.get()
+            if entry is None:
+                break
+
+            pending = [entry]
+            running = self._drain(pending)
+
+            if (delay := self._last_sent + self.min_spacing - time.perf_counter()) > 0:
+                time.sleep(delay)
+                # whatever came in while we waited can go out with this batch
+                running &= self._drain(pending)
+
+            with self._queued_lock:
+                bindings = [binding for generation, binding in pending if generation == self._generation]
+
+            if bindings:
+                self._send(bindings)
+                self._last_sent = time.perf_counter()
+                self.presses += len(bindings)
+                self.batches += 1
+
+            with self._queued_lock:
+                self._queued -= len(pending)
+                if self._queued == 0:
+                    self._idle.set()
+
+        self._idle.set()
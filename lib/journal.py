@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""
+Incremental reader for the game's Journal.*.log files
+
+@author Kami-Kaze
+"""
+
+import glob
+import json
+import os
+from typing import Iterator
+
+from lib import ed
+
+READ_CHUNK_SIZE = 1 << 20
+
+
+class JournalTailer:
+    """
+    Follows the newest journal by byte offset, only ever reading what was appended
+    since the last call. Switches to the next journal once the game rotates its logs.
+
+    The offset is checkpointed to checkpoint_file (json), so a restart
+    resumes where it left off instead of re-reading the whole journal.
+    """
+
+    def __init__(self, path: str, checkpoint_file: str):
+        self.path = path
+        self.checkpoint_file = checkpoint_file
+
+        self.file_name: str or None = None
+        self.offset = 0
+        # lines we could not parse
+        self.errors = 0
+
+        self._file = None
+        # the checkpoint might point to a journal from an earlier session
+        self._scanned = False
+        self._load_checkpoint()
+
+    def read_events(self, changed: str = None) -> Iterator[dict]:
+        """
+        Yields all events appended since the last call, oldest first
+
+        @param changed: name of the journal that changed (if known), a name other than
+                        the current journal makes us look for a newer one
+        """
+        if not self._scanned or self.file_name is None or (changed is not None and changed != self.file_name):
+            self._scanned = True
+            newest = self._find_newest()
+            if newest is not None and newest != self.file_name:
+                # drain the old journal before moving on
+                if self.file_name is not None:
+                    yield from self._read_appended()
+                self._switch(newest, 0)
+
+        if self.file_name is not None:
+            yield from self._read_appended()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _find_newest(self) -> str or None:
+        journals = glob.glob(os.path.join(self.path, ed.Files.JOURNAL_PATTERN))
+        if not journals:
+            return None
+        return os.path.basename(max(journals, key=os.path.getmtime))
+
+    def _switch(self, file_name: str, offset: int):
+        self.close()
+        self.file_name = file_name
+        self.offset = offset
+
+    def _read_appended(self) -> Iterator[dict]:
+        if self._file is None:
+            try:
+                self._file = open(os.path.join(self.path, self.file_name), 'rb')
+            except FileNotFoundError:
+                self._switch(None, 0)
+                return
+
+        size = os.fstat(self._file.fileno()).st_size
+        # file was truncated/replaced, start over
+        if size < self.offset:
+            self.offset = 0
+        if size == self.offset:
+            return
+
+        self._file.seek(self.offset)
+        pending = b''
+        # read in chunks, a fresh journal can be tens of megabytes
+        while chunk := self._file.read(READ_CHUNK_SIZE):
+            data = pending + chunk
+
+            # only consume complete lines, the game might still be writing the last one
+            end = data.rfind(b'\n') + 1
+            pending = data[end:]
+            if end == 0:
+                continue
+
+            for line in data[:end].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    self.errors += 1
+
+            # only checkpoint once everything was handed out
+            self.offset += end
+            self._save_checkpoint()
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                checkpoint = json.load(f)
+            file_name, offset = checkpoint['file'], checkpoint['offset']
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+
+        if os.path.exists(os.path.join(self.path, file_name)):
+            self._switch(file_name, offset)
+
+    def _save_checkpoint(self):
+        tmp = f'{self.checkpoint_file}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'file': self.file_name, 'offset': self.offset}, f)
+        os.replace(tmp, self.checkpoint_file)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+@author Kami-Kaze
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable
+
+# values the percentiles of a RingHistogram are taken over
+RING_SIZE = 1024
+
+
+class Histogram:
+    """
+    Histogram of durations (s) with fixed, log spaced buckets,
+    recording is O(log buckets) and needs no allocation
+    """
+
+    # upper bounds of the buckets: 0.1ms, 0.2ms, 0.4ms, ... ~26s, anything above goes in the last one
+    BOUNDS = tuple(1e-4 * 2 ** i for i in range(19))
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def record(self, value: float):
+        self.counts[bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """
+        @return: upper bound of the bucket containing the q-th (0..1) percentile, 0 if empty
+        """
+        if not self.count:
+            return 0.0
+
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return min(self.BOUNDS[i], self.max) if i < len(self.BOUNDS) else self.max
+        return self.max
+
+    def to_json(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.percentile(.5),
+            'p95': self.percentile(.95),
+            'p99': self.percentile(.99),
+            'max': self.max,
+        }
+
+
+class RingHistogram(Histogram):
+    """
+    Histogram over the last size values only, the oldest value is taken out of its
+    bucket when a new one comes in, all_time_max keeps the max since the start.
+
+    Thread safe, timed functions are called from several threads and read from the ui.
+    """
+
+    def __init__(self, size: int = RING_SIZE):
+        super().__init__()
+        self.size = size
+        # values recorded and their max since the start
+        self.recorded = 0
+        self.all_time_max = 0.0
+        self._ring = [0.0] * size
+        self._next = 0
+        self._lock = threading.RLock()
+
+    def record(self, value: float):
+        with self._lock:
+            old = None
+            if self.count == self.size:
+                old = self._ring[self._next]
+                self.counts[bisect_left(self.BOUNDS, old)] -= 1
+                self.count -= 1
+                self.total -= old
+
+            self._ring[self._next] = value
+            self._next = (self._next + 1) % self.size
+            self.recorded += 1
+            super().record(value)
+            if value > self.all_time_max:
+                self.all_time_max = value
+            # the max just dropped out of the ring, only then it needs a scan
+            if old is not None and old == self.max and value < old:
+                self.max = max(self._ring)
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            return super().percentile(q)
+
+    def to_json(self) -> dict:
+        # one consistent snapshot
+        with self._lock:
+            return {**super().to_json(), 'all_time_max': self.all_time_max, 'recorded': self.recorded}
+
+
+# name -> durations of every function decorated with timed
+TIMINGS: dict[str, RingHistogram] = {}
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """
+    Records how long every call to the decorated function takes in TIMINGS[name],
+    costs two perf_counter calls and a bisect per call
+    """
+    histogram = TIMINGS.setdefault(name, RingHistogram())
+
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                histogram.record(time.perf_counter() - t0)
+
+        return wrapper
+
+    return decorator
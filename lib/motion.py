@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""
+Extrapolation of the ship's position between status updates
+
+Status.json is only written every few hundred milliseconds, the motion model
+keeps the last samples and predicts where we are at render time, so bearing,
+distance and ETA move smoothly instead of in steps.
+
+@author Kami-Kaze
+"""
+
+import math
+import threading
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from lib.metrics import Histogram
+from lib.waypoint import calculate_destination, calculate_distance
+
+# never extrapolate further than this past the last sample (s), we probably stopped or the game is paused
+MAX_EXTRAPOLATION = 2.0
+# samples further apart than this don't tell us anything about the current motion (s)
+MAX_SAMPLE_GAP = 5.0
+# below this speed we are standing still, the samples only differ by rounding (m/s)
+MIN_SPEED = .1
+# SRVs and ships don't turn faster than this, anything above is noise (°/s)
+MAX_TURN_RATE = 90.0
+
+
+class DistanceHistogram(Histogram):
+    """
+    Histogram of distances (m)
+    """
+
+    # 1cm, 2cm, 4cm, ... ~2.6km, anything above goes in the last one
+    BOUNDS = tuple(1e-2 * 2 ** i for i in range(19))
+
+
+@dataclass(slots=True)
+class Sample:
+    t: float
+    lat: float
+    lon: float
+    altitude: float
+    heading: float
+
+
+class Prediction(NamedTuple):
+    position: tuple[float, float]
+    altitude: float
+    heading: float
+
+
+def _wrap(degrees: float) -> float:
+    """
+    @return: degrees normalized to -180..180
+    """
+    return (degrees + 540) % 360 - 180
+
+
+class MotionModel:
+    """
+    Dead reckoning from the last two status samples: moves on along the track at the
+    current speed, turning at the rate the track turned between the last three samples.
+
+    Every sample is also checked against what the model predicted for it, error holds
+    the distance between the two and hold_error what simply keeping the last sample
+    (i.e. no prediction) would have been off, so one can tell whether it helps.
+    """
+
+    def __init__(self):
+        self.error = DistanceHistogram()
+        self.hold_error = DistanceHistogram()
+
+        self._samples: list[Sample] = []
+        self._radius = 0.0
+        # ground velocity in m/s (north, east), its change in °/s and climb rate in m/s
+        self._north = self._east = 0.0
+        self._turn_rate = 0.0
+        self._climb_rate = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def speed(self) -> float:
+        return math.hypot(self._north, self._east)
+
+    def update(self, t: float, position: tuple[float, float], heading: float, altitude: float, planet_radius: float):
+        """
+        Adds a status sample
+
+        @param t: time of the sample (s)
+        @param planet_radius: radius of the planet, without altitude
+        """
+        lat, lon = position
+        sample = Sample(t, lat, lon, altitude, heading)
+        radius = planet_radius + altitude
+
+        with self._lock:
+            samples = self._samples
+            if samples and (t - samples[-1].t > MAX_SAMPLE_GAP or planet_radius != self._radius):
+                # too old or another planet
+                samples.clear()
+
+            if samples:
+                last = samples[-1]
+                predicted = self._predict(t)
+                self.error.record(calculate_distance(predicted.position, position, radius))
+                self.hold_error.record(calculate_distance((last.lat, last.lon), position, radius))
+
+            samples.append(sample)
+            del samples[:-3]
+            self._radius = planet_radius
+            self._fit()
+
+    def predict(self, t: float) -> Prediction or None:
+        """
+        @return: where we are at time t, None without samples
+        """
+        with self._lock:
+            if not self._samples:
+                return None
+            return self._predict(t)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._north = self._east = self._turn_rate = self._climb_rate = 0.0
+
+    def _fit(self):
+        samples = self._samples
+        self._north = self._east = self._turn_rate = self._climb_rate = 0.0
+        if len(samples) < 2:
+            return
+
+        a, b = samples[-2], samples[-1]
+        if (dt := b.t - a.t) <= 0.0:
+            return
+
+        north, east = self._displacement(a, b)
+        self._climb_rate = (b.altitude - a.altitude) / dt
+
+        # the last segment only, a smoothed speed (like MyApp.recent_average_velocity) trails behind when accelerating
+        if math.hypot(north, east) / dt < MIN_SPEED:
+            return
+        self._north, self._east = north / dt, east / dt
+
+        if len(samples) == 3 and (dt0 := a.t - samples[0].t) > 0.0:
+            north0, east0 = self._displacement(samples[0], a)
+            if math.hypot(north0, east0) / dt0 >= MIN_SPEED:
+                turn = _wrap(math.degrees(math.atan2(east, north) - math.atan2(east0, north0)))
+                # between the middles of both segments
+                rate = turn / ((dt + dt0) / 2)
+                self._turn_rate = max(min(rate, MAX_TURN_RATE), -MAX_TURN_RATE)
+
+    def _displacement(self, a: Sample, b: Sample) -> tuple[float, float]:
+        """
+        @return: (north, east) in meters from a to b, flat earth is fine for the few meters between samples
+        """
+        radius = math.radians(self._radius + b.altitude)
+        return (b.lat - a.lat) * radius, _wrap(b.lon - a.lon) * math.cos(math.radians(b.lat)) * radius
+
+    def _predict(self, t: float) -> Prediction:
+        last = self._samples[-1]
+        h = max(min(t - last.t, MAX_EXTRAPOLATION), 0.0)
+        speed = self.speed
+        if h == 0.0 or speed == 0.0:
+            return Prediction((last.lat, last.lon), last.altitude, last.heading)
+
+        # constant turn, going straight along the mean track of the interval is close enough for a second or two
+        turn = self._turn_rate * h
+        track = math.degrees(math.atan2(self._east, self._north)) + turn / 2
+        distance = speed * h
+        if turn:
+            # chord of the arc
+            distance *= math.sin(math.radians(turn / 2)) / math.radians(turn / 2)
+
+        altitude = last.altitude + self._climb_rate * h
+        position = calculate_destination((last.lat, last.lon), track, distance, self._radius + altitude)
+        return Prediction(position, altitude, (last.heading + turn) % 360)
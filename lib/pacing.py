@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+Adaptive frame pacing
+
+The render loop runs at full rate only while something is going on (input, new status
+data), drops to IDLE_FPS after ACTIVE_PERIOD without either and stops rendering while
+the window is hidden. Waiting happens in the window's event wait (glfw.wait_events_timeout), so
+input wakes it right away and other threads wake it through glfw.post_empty_event.
+
+Automation does not depend on frames, it runs on the watchdog and window tracker threads.
+
+@author Kami-Kaze
+"""
+
+import threading
+import time
+from enum import Enum
+from typing import Callable
+
+# frames per second while idle, keeps clocks and the like moving
+IDLE_FPS = 2.0
+# full rate for this long after the last input or status update (s)
+ACTIVE_PERIOD = 2.0
+# a wait that returns this much earlier than asked was woken by an event (s)
+WAKE_TOLERANCE = .002
+# longest wait per frame while hidden, the loop keeps turning so events it dispatches itself (e.g. show) get through (s)
+HIDDEN_WAIT = .25
+
+
+class Pace(Enum):
+    ACTIVE = 'active'
+    IDLE = 'idle'
+    HIDDEN = 'hidden'
+
+
+class FramePacer:
+    """
+    Call wait_frame once per frame on the ui thread, it returns when the next frame is due,
+    or after at most HIDDEN_WAIT while hidden
+    """
+
+    def __init__(self, wait: Callable[[float], None], wake: Callable[[], None], idle_fps: float = IDLE_FPS,
+                 active_period: float = ACTIVE_PERIOD):
+        """
+        @param wait: waits for window events, at most the given seconds (e.g. glfw.wait_events_timeout)
+        @param wake: makes wait return from any thread (e.g. glfw.post_empty_event)
+        """
+        self.wait = wait
+        self.wake = wake
+        self.idle_fps = idle_fps
+        self.active_period = active_period
+
+        self.hidden = False
+        # frames let through and time spent waiting (s)
+        self.frames = 0
+        self.waited = 0.0
+
+        self._last_activity = time.monotonic()
+        self._last_frame = 0.0
+        self._stopped = threading.Event()
+
+    @property
+    def pace(self) -> Pace:
+        if self.hidden:
+            return Pace.HIDDEN
+        if time.monotonic() - self._last_activity < self.active_period:
+            return Pace.ACTIVE
+        return Pace.IDLE
+
+    def activity(self):
+        """
+        Back to full rate, e.g. new data came in, can be called from any thread
+        """
+        idle = self.pace is Pace.IDLE
+        self._last_activity = time.monotonic()
+        if idle:
+            self.wake()
+
+    def hide(self):
+        self.hidden = True
+
+    def show(self):
+        self.hidden = False
+        self.activity()
+        self.wake()
+
+    def stop(self):
+        """
+        Lets wait_frame return right away for good, e.g. when exiting
+        """
+        self._stopped.set()
+        self.wake()
+
+    def wait_frame(self) -> bool:
+        """
+        @return: whether to update this frame, False while hidden
+        """
+        while not self._stopped.is_set():
+            now = time.monotonic()
+            if self.hidden:
+                # return after one wait, never block the loop while hidden, show and stop wake us up
+                self.wait(HIDDEN_WAIT)
+                self.waited += time.monotonic() - now
+                if self.hidden:
+                    return False
+                continue
+            elif now - self._last_activity < self.active_period:
+                break
+            elif (timeout := self._last_frame + 1.0 / self.idle_fps - now) <= 0.0:
+                break
+
+            self.wait(timeout)
+            waited = time.monotonic() - now
+            self.waited += waited
+            if waited < timeout - WAKE_TOLERANCE:
+                # an event (input, or someone calling wake) came in
+                self._last_activity = time.monotonic()
+
+        self.frames += 1
+        self._last_frame = time.monotonic()
+        return True
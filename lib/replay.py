@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+"""
+Record and replay of status.json payloads
+
+Recordings are json lines files, one {"t": <unix time>, "payload": <status json>} per line.
+Replaying writes the payloads to a temporary Status.json, so they travel the
+same way (watchdog -> Handler -> callback) as they do when flying in game.
+
+@author Kami-Kaze
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from lib import ed
+from lib.filesystem import Watchdog
+
+
+class StatusRecorder:
+    def __init__(self, path: str):
+        if directory := os.path.dirname(path):
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def record(self, payload: bytes or str, timestamp: float = None):
+        if isinstance(payload, bytes):
+            payload = payload.decode('utf-8')
+
+        line = json.dumps({'t': time.time() if timestamp is None else timestamp, 'payload': payload})
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.write('\n')
+            # flush right away, a crash should not cost us the recording
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def load_recording(path: str) -> list[tuple[float, str]]:
+    """
+    @return: list of (timestamp, payload) in recorded order
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return [(entry['t'], entry['payload']) for entry in entries]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+@dataclass
+class ReplayReport:
+    updates: int = 0
+    deliveries: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    # payloads identical to the one before, the watchdog (rightfully) ignores those
+    duplicates: int = 0
+    duration: float = 0.0
+    # seconds from writing the file to the pipeline being done with it
+    update_latencies: list[float] = field(default_factory=list)
+    # seconds from writing the file to the press_key call
+    press_latencies: list[float] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """
+        @return: processed status updates per second
+        """
+        return len(self.update_latencies) / self.duration if self.duration > 0 else 0.0
+
+    def summary(self) -> str:
+        def stats(values: list[float]) -> str:
+            if not values:
+                return 'n/a'
+            return (f'mean {sum(values) / len(values) * 1e3:.2f}ms, '
+                    f'p50 {_percentile(values, .5) * 1e3:.2f}ms, '
+                    f'p95 {_percentile(values, .95) * 1e3:.2f}ms, '
+                    f'max {max(values) * 1e3:.2f}ms')
+
+        return '\n'.join([
+            f'updates:     {self.updates} ({self.deliveries} deliveries, {self.duplicates} duplicates, {self.timeouts} timeouts, {self.errors} errors)',
+            f'duration:    {self.duration:.3f}s',
+            f'throughput:  {self.throughput:.1f} updates/s',
+            f'update lag:  {stats(self.update_latencies)}',
+            f'press lag:   {stats(self.press_latencies)} ({len(self.press_latencies)} presses)',
+        ])
+
+
+def replay(recording: list[tuple[float, str]], on_status: Callable[[str], None], speed: float = 0.0, timeout: float = 1.0,
+           settle: Callable[[], object] = None) -> ReplayReport:
+    """
+    Writes each recorded payload to a temporary Status.json and waits for on_status to process it.
+    Requires lib.fake_win to be installed as lib.win if on_status presses keys.
+
+    @param recording: (timestamp, payload) pairs as returned by load_recording
+    @param on_status: pipeline under test, receives the payload read by the watchdog
+    @param speed: replay speed relative to the recording, 0 replays as fast as possible
+    @param timeout: max seconds to wait for a single payload to be delivered
+    @param settle: called after each delivered payload, e.g. to wait for asynchronous key presses
+    """
+    from lib import fake_win
+
+    report = ReplayReport()
+    delivered = threading.Event()
+    expected: str or None = None
+    done_at = 0.0
+
+    def callback(payload: bytes or str):
+        nonlocal done_at
+        report.deliveries += 1
+        try:
+            on_status(payload)
+        except Exception:
+            report.errors += 1
+
+        if isinstance(payload, bytes):
+            payload = payload.decode('utf-8')
+        if payload == expected:
+            done_at = time.perf_counter()
+            delivered.set()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, ed.Files.STATUS)
+        with open(path, 'w', encoding='utf-8'):
+            pass
+
+        watchdog = Watchdog(directory)
+        watchdog.watch(ed.Files.STATUS, callback)
+
+        with watchdog:
+            start = time.perf_counter()
+            first = recording[0][0] if recording else 0.0
+            last_payload = None
+
+            for t, payload in recording:
+                if speed > 0:
+                    delay = (t - first) / speed - (time.perf_counter() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+
+                delivered.clear()
+                expected = payload
+                pressed = len(fake_win.presses)
+
+                written_at = time.perf_counter()
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(payload)
+
+                report.updates += 1
+                if payload == last_payload:
+                    report.duplicates += 1
+                    continue
+                last_payload = payload
+
+                if not delivered.wait(timeout):
+                    report.timeouts += 1
+                    continue
+
+                report.update_latencies.append(done_at - written_at)
+                if settle is not None:
+                    settle()
+                report.press_latencies.extend(pressed_at - written_at for pressed_at, *_ in fake_win.presses[pressed:])
+
+            report.duration = time.perf_counter() - start
+
+    return report
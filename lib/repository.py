@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+@author Kami-Kaze
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Callable, Iterator
+
+from lib.waypoint import Waypoint
+
+
+class Change(Enum):
+    ADDED = 'added'
+    UPDATED = 'updated'
+    REMOVED = 'removed'
+
+
+class WaypointListener(ABC):
+    """
+    Follows a repository by its add, update and remove methods, see WaypointRepository.add_listener
+    """
+
+    @abstractmethod
+    def add(self, waypoint: Waypoint):
+        pass
+
+    @abstractmethod
+    def update(self, waypoint: Waypoint):
+        pass
+
+    @abstractmethod
+    def remove(self, waypoint: Waypoint):
+        pass
+
+    def on_waypoint_change(self, change: Change, waypoint: Waypoint):
+        match change:
+            case Change.ADDED:
+                self.add(waypoint)
+            case Change.UPDATED:
+                self.update(waypoint)
+            case Change.REMOVED:
+                self.remove(waypoint)
+
+
+class WaypointRepository:
+    """
+    Owns the waypoints, indexed by id, name and planet.
+
+    Waypoints are edited in place (e.g. by the edit popup), call update afterwards
+    so the indexes and listeners catch up.
+    """
+
+    def __init__(self, waypoints: list[Waypoint] = ()):
+        self._by_id: dict[str, Waypoint] = {}
+        self._by_name: dict[str, set[str]] = {}
+        self._by_planet: dict[str, dict[str, Waypoint]] = {}
+        # id -> (name, planet) the waypoint is indexed under
+        self._keys: dict[str, tuple[str, str]] = {}
+        self._listeners: list[Callable[[Change, Waypoint], None]] = []
+        # counter of the name allocator, names below it are known to be taken
+        self._next_name = 0
+        self._lock = threading.RLock()
+
+        for waypoint in waypoints:
+            self._index(waypoint)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Waypoint]:
+        with self._lock:
+            return iter(list(self._by_id.values()))
+
+    def __contains__(self, waypoint: Waypoint) -> bool:
+        return waypoint.id in self._by_id
+
+    def add_listener(self, listener: Callable[[Change, Waypoint], None]):
+        self._listeners.append(listener)
+
+    def get(self, id: str) -> Waypoint or None:
+        return self._by_id.get(id)
+
+    def by_name(self, name: str) -> list[Waypoint]:
+        with self._lock:
+            return [self._by_id[id] for id in self._by_name.get(name, ())]
+
+    def on_planet(self, planet: str) -> list[Waypoint]:
+        with self._lock:
+            return list(self._by_planet.get(planet, {}).values())
+
+    def planets(self) -> list[str]:
+        with self._lock:
+            return list(self._by_planet)
+
+    def new_name(self, pattern: str) -> str:
+        """
+        @param pattern: name pattern with one %d, e.g. WAYPOINT_NAME_PATTERN
+        @return: first name after the last one handed out which is not taken
+        """
+        with self._lock:
+            while (name := pattern % self._next_name) in self._by_name:
+                self._next_name += 1
+            self._next_name += 1
+            return name
+
+    def add(self, waypoint: Waypoint):
+        with self._lock:
+            if waypoint.id in self._by_id:
+                raise ValueError(f'Waypoint {waypoint.id} already exists!')
+            self._index(waypoint)
+        self._notify(Change.ADDED, waypoint)
+
+    def update(self, waypoint: Waypoint):
+        with self._lock:
+            # might have been removed in the meantime
+            if waypoint.id not in self._by_id:
+                return
+            self._unindex(waypoint.id)
+            self._index(waypoint)
+        self._notify(Change.UPDATED, waypoint)
+
+    def remove(self, waypoint: Waypoint):
+        with self._lock:
+            if waypoint.id not in self._by_id:
+                return
+            self._unindex(waypoint.id)
+        self._notify(Change.REMOVED, waypoint)
+
+    def _index(self, waypoint: Waypoint):
+        self._by_id[waypoint.id] = waypoint
+        self._by_name.setdefault(waypoint.name, set()).add(waypoint.id)
+        self._by_planet.setdefault(waypoint.planet, {})[waypoint.id] = waypoint
+        self._keys[waypoint.id] = waypoint.name, waypoint.planet
+
+    def _unindex(self, id: str):
+        del self._by_id[id]
+        name, planet = self._keys.pop(id)
+
+        ids = self._by_name[name]
+        ids.discard(id)
+        if not ids:
+            del self._by_name[name]
+
+        waypoints = self._by_planet[planet]
+        del waypoints[id]
+        if not waypoints:
+            del self._by_planet[planet]
+
+    def _notify(self, change: Change, waypoint: Waypoint):
+        for listener in self._listeners:
+            listener(change, waypoint)
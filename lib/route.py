@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+"""
+Visiting order for many waypoints on a planet
+
+Open traveling salesman from our current position: a nearest neighbour tour,
+improved by 2-opt and Or-opt moves until nothing improves or the time budget
+runs out. Moves are evaluated against every position at once with numpy,
+which keeps a pass over 500 stops at a few milliseconds.
+
+@author Kami-Kaze
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from lib.waypoint import Waypoint, calculate_distance, calculate_distances
+
+# time to spend improving the route (s)
+DEFAULT_TIME_BUDGET = .5
+# longest chain of stops Or-opt moves at once
+OR_OPT_SEGMENT = 3
+
+
+@dataclass
+class Route:
+    # stops in visiting order
+    stops: list[Waypoint]
+    # legs[i]: distance (m) to stops[i] from the previous stop, or from where we planned for the first one
+    legs: list[float]
+    planet_radius: float
+    # next stop
+    index: int = 0
+
+    @property
+    def current(self) -> Waypoint or None:
+        return self.stops[self.index] if self.index < len(self.stops) else None
+
+    @property
+    def done(self) -> bool:
+        return self.index >= len(self.stops)
+
+    @property
+    def remaining(self) -> float:
+        """
+        @return: distance (m) from the current stop to the last one
+        """
+        return sum(self.legs[self.index + 1:])
+
+    def advance(self) -> Waypoint or None:
+        """
+        @return: the next stop, None once we are through
+        """
+        self.index = min(self.index + 1, len(self.stops))
+        return self.current
+
+    def remove(self, waypoint: Waypoint):
+        """
+        Drops waypoint (e.g. it was deleted), the route around it is kept as is
+        """
+        if waypoint not in self.stops:
+            return
+
+        i = self.stops.index(waypoint)
+        del self.stops[i]
+        del self.legs[i]
+        if i < self.index:
+            self.index -= 1
+        elif 0 < i < len(self.stops):
+            self.legs[i] = calculate_distance(self.stops[i - 1].position, self.stops[i].position, self.planet_radius)
+
+
+class DistanceMatrix:
+    """
+    Great circle distances between waypoints, kept until waypoints move, so
+    planning the rest of a route again only costs the distances from our position
+    """
+
+    def __init__(self):
+        self._index: dict[str, int] = {}
+        self._positions: dict[str, tuple[float, float]] = {}
+        self._radius = 0.0
+        self._matrix = np.zeros((0, 0))
+        self._lock = threading.Lock()
+
+    def get(self, waypoints: list[Waypoint], planet_radius: float) -> np.ndarray:
+        """
+        @return: (n, n) distances (m) between waypoints
+        """
+        with self._lock:
+            cached = planet_radius == self._radius and all(self._positions.get(waypoint.id) == waypoint.position for waypoint in waypoints)
+            if not cached:
+                lat = np.fromiter((waypoint.lat for waypoint in waypoints), float, len(waypoints))
+                lon = np.fromiter((waypoint.lon for waypoint in waypoints), float, len(waypoints))
+                matrix = np.empty((len(waypoints), len(waypoints)))
+                for i, waypoint in enumerate(waypoints):
+                    matrix[i] = calculate_distances(waypoint.position, lat, lon, planet_radius)
+
+                self._index = {waypoint.id: i for i, waypoint in enumerate(waypoints)}
+                self._positions = {waypoint.id: waypoint.position for waypoint in waypoints}
+                self._radius = planet_radius
+                self._matrix = matrix
+                return matrix
+
+            rows = np.fromiter((self._index[waypoint.id] for waypoint in waypoints), int, len(waypoints))
+            return self._matrix[np.ix_(rows, rows)]
+
+
+def nearest_neighbour(d: np.ndarray) -> list[int]:
+    """
+    @param d: (n, n) distances, node 0 is the start
+    @return: open tour from node 0, always going to the closest node not visited yet
+    """
+    n = len(d)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    tour = [0]
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, d[tour[-1]])
+        nxt = int(np.argmin(row))
+        visited[nxt] = True
+        tour.append(nxt)
+    return tour
+
+
+def tour_length(d: np.ndarray, tour: list[int] or np.ndarray) -> float:
+    tour = np.asarray(tour)
+    return float(d[tour[:-1], tour[1:]].sum())
+
+
+def _two_opt(d: np.ndarray, path: np.ndarray, deadline: float) -> bool:
+    """
+    Reverses path[i + 1..j] wherever that shortens it, in place
+
+    @return: whether anything improved
+    """
+    m = len(path) - 1
+    improved = False
+    for i in range(m - 1):
+        if time.perf_counter() > deadline:
+            break
+
+        a, b = path[i], path[i + 1]
+        # replace (a, b) and (c, e) by (a, c) and (b, e) for every later edge (c, e)
+        c, e = path[i + 1:m], path[i + 2:m + 1]
+        delta = d[a, c] + d[b, e] - d[a, b] - d[c, e]
+        j = int(np.argmin(delta))
+        if delta[j] < -1e-9:
+            j += i + 1
+            path[i + 1:j + 1] = path[i + 1:j + 1][::-1].copy()
+            improved = True
+    return improved
+
+
+def _or_opt(d: np.ndarray, path: np.ndarray, deadline: float) -> bool:
+    """
+    Moves chains of up to OR_OPT_SEGMENT stops elsewhere (possibly reversed) wherever that shortens path, in place
+
+    @return: whether anything improved
+    """
+    improved = False
+    for length in range(1, OR_OPT_SEGMENT + 1):
+        i = 1
+        while i + length < len(path):
+            if time.perf_counter() > deadline:
+                return improved
+
+            p, s0, s1, n = path[i - 1], path[i], path[i + length - 1], path[i + length]
+            gain = d[p, s0] + d[s1, n] - d[p, n]
+
+            # insert between (x, y) for every edge not touching the chain
+            rest = np.concatenate((path[:i], path[i + length:]))
+            x, y = rest[:-1], rest[1:]
+            base = d[x, y]
+            forward = d[x, s0] + d[s1, y] - base
+            backward = d[x, s1] + d[s0, y] - base
+            # (p, n) is where the chain came from
+            forward[i - 1] = backward[i - 1] = np.inf
+
+            j_f, j_b = int(np.argmin(forward)), int(np.argmin(backward))
+            reverse = backward[j_b] < forward[j_f]
+            j, cost = (j_b, backward[j_b]) if reverse else (j_f, forward[j_f])
+            if cost - gain < -1e-9:
+                chain = path[i:i + length]
+                if reverse:
+                    chain = chain[::-1]
+                path[:] = np.concatenate((rest[:j + 1], chain, rest[j + 1:]))
+                improved = True
+                # the path moved under us, look at the same position again
+                continue
+            i += 1
+    return improved
+
+
+def optimize(d: np.ndarray, tour: list[int], time_budget: float = DEFAULT_TIME_BUDGET) -> list[int]:
+    """
+    Improves an open tour starting at node 0 by 2-opt and Or-opt moves
+
+    @param d: (n, n) distances
+    @param time_budget: stop improving after this long (s)
+    @return: improved tour, still starting at node 0
+    """
+    if len(tour) < 3:
+        return list(tour)
+
+    # a dummy node at no distance to all others closes the tour, moves then never touch the start or the dummy
+    n = len(d)
+    closed = np.zeros((n + 1, n + 1))
+    closed[:n, :n] = d
+    path = np.array([*tour, n])
+
+    deadline = time.perf_counter() + time_budget
+    while time.perf_counter() < deadline:
+        improved = _two_opt(closed, path, deadline)
+        improved |= _or_opt(closed, path, deadline)
+        if not improved:
+            break
+
+    return [int(node) for node in path[:-1]]
+
+
+def plan_route(position: tuple[float, float], waypoints: list[Waypoint], planet_radius: float,
+               matrix: DistanceMatrix = None, time_budget: float = DEFAULT_TIME_BUDGET) -> Route:
+    """
+    @param position: where the route starts
+    @param matrix: cache of the distances between the waypoints, e.g. to plan again after some were visited
+    @return: route through all waypoints
+    """
+    if not waypoints:
+        return Route([], [], planet_radius)
+
+    between = (matrix if matrix is not None else DistanceMatrix()).get(waypoints, planet_radius)
+    lat = np.fromiter((waypoint.lat for waypoint in waypoints), float, len(waypoints))
+    lon = np.fromiter((waypoint.lon for waypoint in waypoints), float, len(waypoints))
+    start = calculate_distances(position, lat, lon, planet_radius)
+
+    # node 0 is where we are
+    n = len(waypoints) + 1
+    d = np.empty((n, n))
+    d[0, 0] = 0.0
+    d[0, 1:] = d[1:, 0] = start
+    d[1:, 1:] = between
+
+    tour = optimize(d, nearest_neighbour(d), time_budget)
+    legs = d[tour[:-1], tour[1:]]
+    return Route([waypoints[i - 1] for i in tour[1:]], [float(leg) for leg in legs], planet_radius)
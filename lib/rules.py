@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""
+Declarative automation rules
+
+A rule presses a key bind whenever `flag` is not in the desired `state`, as long as
+all `required` flags are set and none of the `forbidden` flags are. Rules are compiled
+into a table of int masks, evaluated in a single pass over the status flags.
+
+User defined rules can be added to the "rules" list in .data/config.json, e.g.
+allowing to switch FA while landed (but not docked):
+    {"name": "FA off (landed)", "flag": "FLIGHT_ASSIST_OFF", "state": true,
+     "key": "F5", "required": ["LANDED"], "forbidden": ["DOCKED", "IN_SRV"]}
+Like the built-in ones, a rule with a "toggle" (e.g. "auto_fa") only applies while that toggle is enabled.
+
+@author Kami-Kaze
+"""
+
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, NamedTuple
+
+from lib.ed import Status
+from lib.globals import *
+
+# flags not coming from the game but maintained by the automation, kept above the game's 32 bits
+WAS_DOCKED_OR_LANDED = 1 << 32
+
+SYNTHETIC_FLAGS = {
+    'WAS_DOCKED_OR_LANDED': WAS_DOCKED_OR_LANDED,
+}
+
+
+def flag_mask(names: Iterable[str]) -> int:
+    mask = 0
+    for name in names:
+        if name in SYNTHETIC_FLAGS:
+            mask |= SYNTHETIC_FLAGS[name]
+        elif name in Status.__members__:
+            mask |= int(Status[name])
+        else:
+            raise ValueError(f'Unknown flag {name}!')
+    return mask
+
+
+def key_code(key: str or int) -> int:
+    """
+    @param key: scan code or name of a key without the VK_ or KEY_ prefix (e.g. 'F5', 'RSHIFT', 'L')
+    """
+    if isinstance(key, int):
+        return key
+    # letters and digits are KEY_*, everything else VK_*
+    if (vk := getattr(win, f'VK_{key.upper()}', None)) is None and (vk := getattr(win, f'KEY_{key.upper()}', None)) is None:
+        raise ValueError(f'Unknown key {key}!')
+    return win.scan_code(vk)
+
+
+class CompiledRule(NamedTuple):
+    required: int
+    forbidden: int
+    mask: int
+    desired: int
+    key: int
+    mods: tuple[int, ...]
+    resets: int
+    name: str
+
+
+@dataclass
+class Rule:
+    name: str
+    # flag controlled by this rule and its desired state
+    flag: str
+    state: bool
+    # key bind toggling flag
+    key: str or int
+    mods: list[str or int] = field(default_factory=lambda: [KEY_GLOBAL_MOD])
+    required: list[str] = field(default_factory=list)
+    forbidden: list[str] = field(default_factory=list)
+    # synthetic flags to clear once the rule fired
+    resets: list[str] = field(default_factory=list)
+    # name of the config toggle enabling this rule, None for always enabled
+    toggle: str or None = None
+
+    @staticmethod
+    def from_json(args: dict):
+        return Rule(**args)
+
+    def compile(self) -> CompiledRule:
+        mask = flag_mask([self.flag])
+        return CompiledRule(
+                required=flag_mask(self.required),
+                forbidden=flag_mask(self.forbidden),
+                mask=mask,
+                desired=mask if self.state else 0,
+                key=key_code(self.key),
+                mods=tuple(key_code(mod) for mod in self.mods),
+                resets=flag_mask(self.resets),
+                name=self.name,
+        )
+
+
+_FSD_ACTIVE = ['FSD_CHARGING', 'SUPER_CRUISE', 'FSD_JUMP']
+
+BUILTIN_RULES = [
+    Rule('Disable Flight assist', 'FLIGHT_ASSIST_OFF', True, KEY_FA,
+         forbidden=['IN_SRV', 'DOCKED', 'LANDED', *_FSD_ACTIVE], toggle='auto_fa'),
+    Rule('Disable Drive assist', 'SRV_DRIVE_ASSIST', False, KEY_DA,
+         required=['IN_SRV'], toggle='auto_da'),
+    Rule('Retracting gear', 'GEAR_DOWN', False, KEY_GEAR,
+         required=['WAS_DOCKED_OR_LANDED'], forbidden=['DOCKED', 'LANDED'], resets=['WAS_DOCKED_OR_LANDED'], toggle='auto_gear'),
+    # todo: not sure when one can toggle lights
+    Rule('Enable lights', 'LIGHTS_ON', True, KEY_LIGHTS,
+         forbidden=_FSD_ACTIVE, toggle='auto_lights'),
+    # todo: not sure when one can toggle night vision either
+    Rule('Enable night vision', 'NIGHT_VISION', True, KEY_NIGHT_VISION,
+         forbidden=_FSD_ACTIVE, toggle='auto_night_vision'),
+]
+
+
+class RuleTable:
+    def __init__(self, rules: Iterable[Rule] = ()):
+        self.table: list[CompiledRule] = [rule.compile() for rule in rules]
+
+    @staticmethod
+    def from_config(config) -> 'RuleTable':
+        """
+        Compiles the built-in and the user defined rules (config.rules) whose toggle is
+        enabled in config, rules that fail to load are logged and skipped
+        """
+        rules = list(BUILTIN_RULES)
+        for args in getattr(config, 'rules', []):
+            try:
+                rules.append(Rule.from_json(args))
+            except (TypeError, ValueError) as e:
+                LOGGER.error(f'Invalid rule {args}: {e}')
+
+        table = RuleTable()
+        for rule in rules:
+            try:
+                if rule.toggle is not None and not getattr(config, rule.toggle):
+                    continue
+                table.table.append(rule.compile())
+            except AttributeError:
+                LOGGER.error(f'Invalid rule {rule.name}: Unknown toggle {rule.toggle}!')
+            except ValueError as e:
+                LOGGER.error(f'Invalid rule {rule.name}: {e}')
+        return table
+
+    def matches(self, flags: int) -> Iterator[CompiledRule]:
+        """
+        @return: rules which need their key pressed for flags
+        """
+        for rule in self.table:
+            if flags & rule.required == rule.required and not flags & rule.forbidden and flags & rule.mask != rule.desired:
+                yield rule
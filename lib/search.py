@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+"""
+Index for the fuzzy waypoint filter
+
+@author Kami-Kaze
+"""
+
+import math
+import threading
+from collections import Counter
+
+from lib.repository import WaypointListener
+from lib.waypoint import Waypoint
+
+TRIGRAM = 3
+
+
+def partial_ratio(s1: str, s2: str) -> int:
+    # fuzzywuzzy takes a while to import and most starts never filter, replace this with the real thing on first use
+    global partial_ratio
+    from fuzzywuzzy.fuzz import partial_ratio
+    return partial_ratio(s1, s2)
+
+
+def search_text(waypoint: Waypoint) -> str:
+    return f'{waypoint.name} {waypoint.planet}'.lower()
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)}
+
+
+def min_shared_trigrams(query: str, min_ratio: float) -> int:
+    """
+    Lower bound (q-gram lemma) on the distinct trigrams of query a text at least as long
+    as query has to contain for min_ratio <= partial_ratio(query, text)
+
+    partial_ratio scores query against a window of the text, of length len(query) or less
+    at the text's end, and the ratio counts the characters matched in order. Every
+    unmatched query character breaks at most TRIGRAM of the query's trigrams, every gap
+    between matched characters in the window at most TRIGRAM - 1.
+
+    @return: bound, 0 or less if any text can match (e.g. short queries or low ratios)
+    """
+    length = len(query)
+    positions = length - TRIGRAM + 1
+    if positions <= 0:
+        return 0
+
+    # partial_ratio rounds to int
+    ratio = (min_ratio - .5) / 100
+    broken = 0
+    for window in range(1, length + 1):
+        matched = max(math.ceil(ratio * (length + window) / 2 - 1e-9), 0)
+        if matched > window:
+            continue
+        broken = max(broken, TRIGRAM * (length - matched) + (TRIGRAM - 1) * (window - matched))
+
+    # repeated trigrams of the query count once in the index
+    return positions - broken - (positions - len(trigrams(query)))
+
+
+class WaypointSearch(WaypointListener):
+    """
+    Fuzzy waypoint filter, returning exactly the waypoints with
+    min_ratio <= partial_ratio(query, search_text(waypoint)), but only scoring those
+    which can get there:
+
+    - texts at least as long as the query need min_shared_trigrams with it, counted
+      on a trigram index, shorter texts are always scored
+    - when the bound is 0 or less (short queries, low ratios) every waypoint is scored
+
+    A contained query scores 100 without calling partial_ratio. Search texts are
+    normalized and their trigrams indexed once, when a waypoint is added or updated,
+    so no keystroke pays for building the index.
+
+    Thread safe, the ui thread searches while the repository's listener calls come in
+    from whichever thread changed it.
+    """
+
+    def __init__(self, waypoints: list[Waypoint] = ()):
+        self.waypoints: dict[str, Waypoint] = {}
+        self.texts: dict[str, str] = {}
+        # trigram -> ids
+        self.trigrams: dict[str, set[str]] = {}
+        # text length -> ids, texts shorter than the query are not bound by the trigrams
+        self.lengths: dict[int, set[str]] = {}
+        self.planets: dict[str, set[str]] = {}
+
+        # waypoints scored by the last search
+        self.scored = 0
+        self._lock = threading.RLock()
+
+        for waypoint in waypoints:
+            self.add(waypoint)
+
+    def __len__(self) -> int:
+        return len(self.waypoints)
+
+    def add(self, waypoint: Waypoint):
+        with self._lock:
+            if waypoint.id in self.waypoints:
+                self.remove(waypoint)
+
+            text = search_text(waypoint)
+            self.waypoints[waypoint.id] = waypoint
+            self.texts[waypoint.id] = text
+            for trigram in trigrams(text):
+                self.trigrams.setdefault(trigram, set()).add(waypoint.id)
+            self.lengths.setdefault(len(text), set()).add(waypoint.id)
+            self.planets.setdefault(waypoint.planet, set()).add(waypoint.id)
+
+    def update(self, waypoint: Waypoint):
+        """
+        Re-indexes waypoint after its name (or planet) changed
+        """
+        self.add(waypoint)
+
+    def remove(self, waypoint: Waypoint):
+        with self._lock:
+            if (text := self.texts.pop(waypoint.id, None)) is None:
+                return
+
+            # the stored waypoint, its planet might have been changed in place
+            planet = self.waypoints.pop(waypoint.id).planet
+            for trigram in trigrams(text):
+                self._discard(self.trigrams, trigram, waypoint.id)
+            self._discard(self.lengths, len(text), waypoint.id)
+            self._discard(self.planets, planet, waypoint.id)
+
+    def search(self, query: str, min_ratio: float, planet: str = None) -> list[Waypoint]:
+        """
+        @param planet: only consider waypoints on this planet, None for all
+        @return: waypoints where min_ratio <= partial_ratio(query, search_text(waypoint)),
+                 all (on planet) for an empty query
+        """
+        query = query.lower()
+        with self._lock:
+            if planet is not None:
+                candidates = self.planets.get(planet, set())
+            else:
+                candidates = self.waypoints.keys()
+
+            if not query:
+                self.scored = 0
+                return [self.waypoints[id] for id in candidates]
+
+            if (shortlist := self._shortlist(query, min_ratio)) is None:
+                shortlist = list(candidates)
+            elif len(shortlist) > len(candidates):
+                shortlist = [id for id in candidates if id in shortlist]
+            else:
+                shortlist = [id for id in shortlist if id in candidates]
+
+            self.scored = len(shortlist)
+            return [self.waypoints[id] for id in shortlist if self._matches(query, self.texts[id], min_ratio)]
+
+    def _shortlist(self, query: str, min_ratio: float) -> set[str] or None:
+        """
+        @return: ids which can reach min_ratio, None if that can be any
+        """
+        if (required := min_shared_trigrams(query, min_ratio)) <= 0:
+            return None
+
+        shared = Counter()
+        for trigram in trigrams(query):
+            shared.update(self.trigrams.get(trigram, ()))
+        shortlist = {id for id, n in shared.items() if required <= n}
+
+        for length, ids in self.lengths.items():
+            if length < len(query):
+                shortlist.update(ids)
+        return shortlist
+
+    @staticmethod
+    def _discard(index: dict, key, id: str):
+        ids = index[key]
+        ids.discard(id)
+        if not ids:
+            del index[key]
+
+    @staticmethod
+    def _matches(query: str, text: str, min_ratio: float) -> bool:
+        # partial_ratio is 100 for a contained query, difflib's autojunk only kicks in from 200 characters on
+        if len(text) < 200 and query in text:
+            return True
+        return min_ratio <= partial_ratio(query, text)
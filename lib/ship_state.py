@@ -5,17 +5,74 @@
 @author Kami-Kaze
 """
 
+from lib.ed import Masks
+
+_set = object.__setattr__
+
 
 class ShipState:
-    def __init__(self):
-        self.processed = False
-        self.flight_assist = False
-        self.drive_assist = False
-        self.gear = False
-
-        self.in_srv = False
-        self.fsd_active = False
-        self.docked_or_landed = False
-
-        self.lights = False
-        self.night_vision = False
+    """
+    Immutable snapshot of the status flags.
+
+    Derived properties are single mask tests against the raw flags, `delta` holds
+    the flags that changed compared to the previous snapshot (see next).
+    """
+    __slots__ = ('flags', 'delta')
+
+    def __init__(self, flags: int = 0, delta: int = 0):
+        _set(self, 'flags', flags)
+        _set(self, 'delta', delta)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(flags={self.flags:#010x}, delta={self.delta:#010x})'
+
+    def next(self, flags: int) -> 'ShipState':
+        """
+        @return: snapshot of flags, carrying the delta against this snapshot
+        """
+        return ShipState(flags, flags ^ self.flags)
+
+    def changed(self, mask: int) -> bool:
+        """
+        @return: whether any flag in mask changed compared to the previous snapshot
+        """
+        return bool(self.delta & mask)
+
+    @property
+    def flight_assist(self) -> bool:
+        return not self.flags & Masks.FLIGHT_ASSIST_OFF
+
+    @property
+    def drive_assist(self) -> bool:
+        return bool(self.flags & Masks.SRV_DRIVE_ASSIST)
+
+    @property
+    def gear(self) -> bool:
+        return bool(self.flags & Masks.GEAR_DOWN)
+
+    @property
+    def in_srv(self) -> bool:
+        return bool(self.flags & Masks.IN_SRV)
+
+    @property
+    def fsd_active(self) -> bool:
+        return bool(self.flags & Masks.FSD_ACTIVE)
+
+    @property
+    def docked_or_landed(self) -> bool:
+        return bool(self.flags & Masks.DOCKED_OR_LANDED)
+
+    @property
+    def lights(self) -> bool:
+        return bool(self.flags & Masks.LIGHTS_ON)
+
+    @property
+    def night_vision(self) -> bool:
+        return bool(self.flags & Masks.NIGHT_VISION)
+
+    @property
+    def has_position(self) -> bool:
+        return bool(self.flags & Masks.HAS_LAT_LONG)
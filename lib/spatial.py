@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+Spatial index for nearest waypoint queries
+
+@author Kami-Kaze
+"""
+
+import heapq
+import math
+import threading
+from itertools import product
+
+from lib.repository import WaypointListener
+from lib.waypoint import Waypoint, calculate_distance, radians
+
+# edge length of a grid cell on the unit sphere, ~0.45° (~13km on a 1700km planet)
+CELL_SIZE = 1 / 128
+
+Vector = tuple[float, float, float]
+Cell = tuple[int, int, int]
+
+
+def unit_vector(lat: float, lon: float) -> Vector:
+    lat, lon = radians(lat, lon)
+    cos_lat = math.cos(lat)
+    return cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat)
+
+
+def chord(a: Vector, b: Vector) -> float:
+    """
+    Straight line distance on the unit sphere, grows monotonically with the great circle distance
+    """
+    return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2)
+
+
+def _cell(v: Vector) -> Cell:
+    return math.floor(v[0] / CELL_SIZE), math.floor(v[1] / CELL_SIZE), math.floor(v[2] / CELL_SIZE)
+
+
+class SphereGrid:
+    """
+    Waypoints of a single planet, bucketed by their unit sphere position into cubic cells
+    """
+
+    def __init__(self):
+        self.cells: dict[Cell, dict[str, tuple[Waypoint, Vector]]] = {}
+        self.points: dict[str, Cell] = {}
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def add(self, waypoint: Waypoint):
+        v = unit_vector(waypoint.lat, waypoint.lon)
+        cell = _cell(v)
+        self.cells.setdefault(cell, {})[waypoint.id] = waypoint, v
+        self.points[waypoint.id] = cell
+
+    def remove(self, waypoint_id: str):
+        cell = self.points.pop(waypoint_id)
+        bucket = self.cells[cell]
+        del bucket[waypoint_id]
+        if not bucket:
+            del self.cells[cell]
+
+    def candidates(self, v: Vector, max_chord: float):
+        """
+        @return: (waypoint, vector) of every point within max_chord of v, plus some that are a bit further
+        """
+        reach = math.ceil(max_chord / CELL_SIZE)
+        cx, cy, cz = _cell(v)
+
+        # scanning the occupied cells is cheaper than probing a huge, mostly empty cube
+        if (2 * reach + 1) ** 3 > len(self.cells):
+            for bucket in self.cells.values():
+                yield from bucket.values()
+            return
+
+        span = range(-reach, reach + 1)
+        for dx, dy, dz in product(span, span, span):
+            if (bucket := self.cells.get((cx + dx, cy + dy, cz + dz))) is not None:
+                yield from bucket.values()
+
+
+class WaypointIndex(WaypointListener):
+    """
+    Per planet spatial index over waypoints (see SphereGrid), kept up to date
+    incrementally with add/update/remove. Safe to query from another thread.
+    """
+
+    def __init__(self, waypoints: list[Waypoint] = ()):
+        self.grids: dict[str, SphereGrid] = {}
+        self._planets: dict[str, str] = {}
+        self._lock = threading.Lock()
+        for waypoint in waypoints:
+            self.add(waypoint)
+
+    def add(self, waypoint: Waypoint):
+        with self._lock:
+            self.grids.setdefault(waypoint.planet, SphereGrid()).add(waypoint)
+            self._planets[waypoint.id] = waypoint.planet
+
+    def remove(self, waypoint: Waypoint):
+        with self._lock:
+            if (planet := self._planets.pop(waypoint.id, None)) is None:
+                return
+
+            grid = self.grids[planet]
+            grid.remove(waypoint.id)
+            if not len(grid):
+                del self.grids[planet]
+
+    def update(self, waypoint: Waypoint):
+        """
+        Re-indexes waypoint after its position (or planet) changed
+        """
+        self.remove(waypoint)
+        self.add(waypoint)
+
+    def nearest(self, planet: str, position: tuple[float, float], k: int = 1, planet_radius: float = 1.0) -> list[tuple[float, Waypoint]]:
+        """
+        @return: up to k (distance, waypoint) on planet closest to position, closest first
+        """
+        v = unit_vector(*position)
+        with self._lock:
+            if (grid := self.grids.get(planet)) is None or k <= 0:
+                return []
+
+            # widen the search until k points are known to be within reach
+            max_chord = CELL_SIZE
+            while True:
+                found = [(chord(v, p), waypoint) for waypoint, p in grid.candidates(v, max_chord)]
+                within = [(c, waypoint) for c, waypoint in found if c <= max_chord]
+                if len(within) >= k or max_chord >= 2.0:
+                    break
+                max_chord *= 2
+
+            best = heapq.nsmallest(k, within if len(within) >= k else found, key=lambda x: x[0])
+
+        return [(calculate_distance(position, waypoint.position, planet_radius), waypoint) for _, waypoint in best]
+
+    def within(self, planet: str, position: tuple[float, float], distance: float, planet_radius: float) -> list[tuple[float, Waypoint]]:
+        """
+        @return: (distance, waypoint) of every waypoint on planet within distance (m) of position, closest first
+        """
+        v = unit_vector(*position)
+        angle = min(distance / planet_radius, math.pi)
+        # chord of the angle, plus a bit to be safe against rounding
+        max_chord = 2 * math.sin(angle / 2) + 1e-9
+
+        with self._lock:
+            if (grid := self.grids.get(planet)) is None:
+                return []
+            found = [waypoint for waypoint, p in grid.candidates(v, max_chord) if chord(v, p) <= max_chord]
+
+        result = [(d, waypoint) for waypoint in found if (d := calculate_distance(position, waypoint.position, planet_radius)) <= distance]
+        result.sort(key=lambda x: x[0])
+        return result
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""
+Decoding of status.json payloads
+
+Uses orjson if it's installed, the standard library json module otherwise
+
+@author Kami-Kaze
+"""
+
+from dataclasses import dataclass
+
+from lib.ed import Masks
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
+
+JSON_BACKEND = _loads.__module__
+
+_HAS_LAT_LONG = Masks.HAS_LAT_LONG
+
+
+@dataclass(slots=True)
+class StatusRecord:
+    flags: int = 0
+    lat: float = 0.0
+    lon: float = 0.0
+    heading: float = 0.0
+    altitude: float = 0.0
+    planet_radius: float = 0.0
+    body_name: str = ''
+
+    @property
+    def has_position(self) -> bool:
+        return bool(self.flags & _HAS_LAT_LONG)
+
+    @property
+    def position(self) -> tuple[float, float]:
+        return self.lat, self.lon
+
+
+def decode_status(payload: bytes or str) -> StatusRecord:
+    """
+    Decodes a status.json payload, position fields are only looked at if Status.HAS_LAT_LONG is set
+    """
+    data = _loads(payload)
+    # the game writes a status without flags while in the main menu
+    flags = data.get('Flags', 0)
+
+    if not flags & _HAS_LAT_LONG:
+        return StatusRecord(flags)
+
+    return StatusRecord(
+            flags,
+            data['Latitude'],
+            data['Longitude'],
+            data['Heading'],
+            data.get('Altitude', 0.0),
+            data.get('PlanetRadius', 0.0),
+            data.get('BodyName', ''),
+    )
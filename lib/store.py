@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+"""
+Crash safe waypoint persistence
+
+Waypoints live in a snapshot (the json array in .data/waypoints.json) plus a journal
+next to it (waypoints.json.journal), one change per line:
+    {"put": {<waypoint>}}   waypoint added or edited
+    {"delete": "<id>"}      waypoint deleted
+
+Every change is appended to the journal right away. Once enough changes piled up,
+the journal is compacted into a new snapshot in the background.
+
+@author Kami-Kaze
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from lib.globals import *
+from lib.util import find_first_available
+from lib.waypoint import Waypoint
+
+# compact the journal into the snapshot after this many changes, or once it has more changes than the snapshot has waypoints
+COMPACT_AFTER = 1000
+# changes written between two flushes of the journal while batching, a crash loses at most these
+BATCH_SIZE = 1000
+
+
+class WaypointStore:
+    """
+    Appends every change to the journal, so a crash costs at most the change being written.
+
+    Compaction writes the current state to a temporary file, atomically replaces the
+    snapshot with it and then drops the compacted changes from the journal. Replaying
+    a change already in the snapshot does no harm, so a crash at any point of the
+    compaction loses nothing.
+    """
+
+    def __init__(self, path: str, backup_pattern: str = WAYPOINT_BACKUP_PATTERN, compact_after: int = COMPACT_AFTER):
+        self.path = path
+        self.journal_path = f'{path}.journal'
+        self.backup_pattern = backup_pattern
+        self.compact_after = compact_after
+
+        # journal lines we could not parse
+        self.errors = 0
+        # changes coming in after close, e.g. from an import still running on exit
+        self.dropped = 0
+        # changes appended since the last compaction
+        self.pending = 0
+
+        # open batches and changes written since the last flush
+        self._batches = 0
+        self._unflushed = 0
+        # id -> json of every waypoint, what the next snapshot will contain
+        self._records: dict[str, dict] = {}
+        self._journal = None
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._compaction: threading.Thread or None = None
+
+    def load(self) -> list[Waypoint]:
+        """
+        Reads the snapshot and replays the journal on top, a corrupt snapshot is
+        moved to a backup (see WAYPOINT_BACKUP_PATTERN) and we start without it
+        """
+        self._records = {}
+        self._load_snapshot()
+        self._replay_journal()
+        self._journal = open(self.journal_path, 'ab')
+        return [Waypoint.from_json(dict(record)) for record in self._records.values()]
+
+    def put(self, waypoint: Waypoint):
+        """
+        Records an added or edited waypoint
+        """
+        record = dict(waypoint.__dict__)
+        self._append({'put': record}, waypoint.id, record)
+
+    def delete(self, waypoint: Waypoint):
+        self._append({'delete': waypoint.id}, waypoint.id, None)
+
+    @contextmanager
+    def batch(self):
+        """
+        Flushes the journal once per BATCH_SIZE changes instead of after every one while
+        inside, e.g. while importing, and once more when leaving
+        """
+        with self._lock:
+            self._batches += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._batches -= 1
+                if self._journal is not None and self._unflushed:
+                    self._journal.flush()
+                    self._unflushed = 0
+
+    def compact(self, wait: bool = False):
+        """
+        Writes a new snapshot in the background and trims the journal
+
+        @param wait: compact on the calling thread instead
+        """
+        if wait:
+            self._compact()
+            return
+
+        with self._lock:
+            if self._compaction is None:
+                self._compaction = threading.Thread(target=self._compact, name='WaypointStore', daemon=True)
+                self._compaction.start()
+
+    def close(self):
+        with self._lock:
+            if self._journal is None:
+                return
+            compaction = self._compaction
+
+        # a background compaction might still be waiting for its turn, the journal has to outlive it
+        if compaction is not None:
+            compaction.join()
+        if self.pending:
+            self.compact(wait=True)
+        with self._lock:
+            self._journal.close()
+            self._journal = None
+
+    def _append(self, change: dict, id: str, record: dict or None):
+        line = json.dumps(change).encode('utf-8') + b'\n'
+        with self._lock:
+            if self._journal is None:
+                self.dropped += 1
+                if self.dropped == 1:
+                    LOGGER.warning('Waypoint store is closed, not saving changes anymore')
+                return
+
+            if record is None:
+                self._records.pop(id, None)
+            else:
+                self._records[id] = record
+
+            self._journal.write(line)
+            self._unflushed += 1
+            # flush right away, the change has to be on disk when the process dies
+            if not self._batches or BATCH_SIZE <= self._unflushed:
+                self._journal.flush()
+                self._unflushed = 0
+            self.pending += 1
+            # scaling with the snapshot keeps bulk imports from rewriting it over and over
+            compact = max(self.compact_after, len(self._records)) <= self.pending and self._compaction is None
+
+        if compact:
+            self.compact()
+
+    def _compact(self):
+        try:
+            with self._compact_lock:
+                self._write_snapshot()
+        except OSError as e:
+            LOGGER.error(f'Failed to compact waypoints: {e}')
+        finally:
+            with self._lock:
+                if self._compaction is threading.current_thread():
+                    self._compaction = None
+
+    def _write_snapshot(self):
+        with self._lock:
+            # closed in the meantime, close compacted already
+            if self._journal is None:
+                return
+            records = list(self._records.values())
+            compacted = self._journal.tell()
+            pending = self.pending
+
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(records, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+        with self._lock:
+            # keep whatever was appended while we wrote the snapshot
+            self._journal.close()
+            with open(self.journal_path, 'rb') as f:
+                f.seek(compacted)
+                rest = f.read()
+
+            tmp = f'{self.journal_path}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(rest)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.journal_path)
+
+            self._journal = open(self.journal_path, 'ab')
+            self._unflushed = 0
+            self.pending -= pending
+
+    def _load_snapshot(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return
+
+        try:
+            records = json.loads(content) if content.strip() else []
+            self._records = {record['id']: record for record in records}
+        except (ValueError, KeyError, TypeError):
+            p = find_first_available(self.backup_pattern, lambda p: os.path.exists(p))
+            LOGGER.error(f'Failed to read waypoints file! A backup has been saved to {p}')
+            with open(p, 'w', encoding='utf-8') as backup:
+                backup.write(content)
+            self._records = {}
+
+    def _replay_journal(self):
+        try:
+            with open(self.journal_path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return
+
+        # the last line might have been cut off by a crash, drop it so appending starts on a fresh line
+        end = content.rfind(b'\n') + 1
+        if end < len(content):
+            LOGGER.warning(f'Dropping incomplete change at the end of {self.journal_path}')
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(end)
+
+        lines = content[:end].splitlines()
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                change = json.loads(line)
+                if 'put' in change:
+                    record = change['put']
+                    self._records[record['id']] = record
+                else:
+                    self._records.pop(change['delete'], None)
+            except (ValueError, KeyError, TypeError):
+                self.errors += 1
+
+        if self.errors:
+            LOGGER.error(f'Skipped {self.errors} unreadable changes in {self.journal_path}')
+        self.pending = len(lines)
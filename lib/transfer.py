@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+
+"""
+Streaming import/export of waypoints
+
+Supported formats, picked by file extension:
+    .csv                columns id (optional), name, planet, lat, lon
+    .geojson            FeatureCollection of Points, properties id (optional), name, planet
+    .jsonl / .ndjson    one waypoint object per line, id optional
+
+Records are read and written one at a time, so files of any size only take
+memory for the waypoints actually added.
+
+@author Kami-Kaze
+"""
+
+import csv
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, TextIO
+
+from lib.repository import WaypointRepository
+from lib.waypoint import Waypoint
+
+READ_CHUNK_SIZE = 1 << 16
+# a single geojson feature bigger than this is considered broken
+MAX_FEATURE_SIZE = 1 << 20
+# per row errors kept in the report, the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+CSV_COLUMNS = ('id', 'name', 'planet', 'lat', 'lon')
+
+Record = dict or Exception
+
+
+@dataclass
+class ImportReport:
+    added: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    # (row, error) of the first MAX_REPORTED_ERRORS failed rows
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+    def error(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row, message))
+
+    def summary(self) -> str:
+        return f'{self.added} added, {self.duplicates} duplicates skipped, {self.failed} failed'
+
+
+# --                      READERS                      -- #
+
+def read_csv(f: TextIO) -> Iterator[tuple[int, Record]]:
+    reader = csv.DictReader(f)
+    for record in reader:
+        yield reader.line_num, record
+
+
+def read_jsonl(f: TextIO) -> Iterator[tuple[int, Record]]:
+    for row, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield row, json.loads(line)
+        except ValueError as e:
+            yield row, e
+
+
+def read_geojson(f: TextIO) -> Iterator[tuple[int, Record]]:
+    """
+    Decodes the features of a FeatureCollection one by one, without loading the whole file
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos = '', 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = f.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        # drop what was consumed already
+        buffer, pos = buffer[pos:] + chunk, 0
+        return not eof
+
+    # skip ahead to the features array
+    key = '"features"'
+    while (start := buffer.find(key, pos)) < 0:
+        # keep the tail, the key might be split between chunks
+        pos = max(len(buffer) - len(key), 0)
+        if not fill():
+            raise ValueError('Not a FeatureCollection, "features" is missing')
+    pos = start + len(key)
+    while (start := buffer.find('[', pos)) < 0:
+        pos = len(buffer)
+        if not fill():
+            raise ValueError('"features" is not an array')
+    pos = start + 1
+
+    row = 0
+    while True:
+        # skip to the next feature
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) or not fill():
+                break
+        if pos == len(buffer) or buffer[pos] == ']':
+            return
+
+        try:
+            feature, pos = decoder.raw_decode(buffer, pos)
+        except ValueError as e:
+            # most likely incomplete, read on unless the feature is way too big
+            if len(buffer) - pos < MAX_FEATURE_SIZE and fill():
+                continue
+            yield row + 1, e
+            return
+
+        row += 1
+        if not isinstance(feature, dict):
+            yield row, ValueError('Feature is not an object')
+            continue
+
+        properties = feature.get('properties') or {}
+        coordinates = (feature.get('geometry') or {}).get('coordinates') or []
+        yield row, {**properties, 'lon': coordinates[0] if coordinates else None, 'lat': coordinates[1] if len(coordinates) > 1 else None}
+
+
+# --                      WRITERS                      -- #
+
+def write_csv(f: TextIO, waypoints: Iterable[Waypoint]) -> int:
+    writer = csv.writer(f)
+    writer.writerow(CSV_COLUMNS)
+    n = 0
+    for waypoint in waypoints:
+        writer.writerow((waypoint.id, waypoint.name, waypoint.planet, waypoint.lat, waypoint.lon))
+        n += 1
+    return n
+
+
+def write_jsonl(f: TextIO, waypoints: Iterable[Waypoint]) -> int:
+    n = 0
+    for waypoint in waypoints:
+        f.write(json.dumps(waypoint.__dict__))
+        f.write('\n')
+        n += 1
+    return n
+
+
+def write_geojson(f: TextIO, waypoints: Iterable[Waypoint]) -> int:
+    f.write('{"type": "FeatureCollection", "features": [\n')
+    n = 0
+    for waypoint in waypoints:
+        if n:
+            f.write(',\n')
+        f.write(json.dumps({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [waypoint.lon, waypoint.lat]},
+            'properties': {'id': waypoint.id, 'name': waypoint.name, 'planet': waypoint.planet},
+        }))
+        n += 1
+    f.write('\n]}\n')
+    return n
+
+
+FORMATS: dict[str, tuple[Callable[[TextIO], Iterator[tuple[int, Record]]], Callable[[TextIO, Iterable[Waypoint]], int]]] = {
+    '.csv': (read_csv, write_csv),
+    '.geojson': (read_geojson, write_geojson),
+    '.jsonl': (read_jsonl, write_jsonl),
+    '.ndjson': (read_jsonl, write_jsonl),
+}
+
+
+def _format(path: str):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f'Unsupported format {extension}, use one of {", ".join(FORMATS)}')
+    return FORMATS[extension]
+
+
+def _to_waypoint(record: dict) -> Waypoint:
+    if not isinstance(record, dict):
+        raise ValueError('Record is not an object')
+    name, planet = record.get('name'), record.get('planet')
+    if not isinstance(name, str) or not name:
+        raise ValueError('name is missing')
+    if not isinstance(planet, str) or not planet:
+        raise ValueError('planet is missing')
+
+    try:
+        lat, lon = float(record.get('lat')), float(record.get('lon'))
+    except (TypeError, ValueError):
+        raise ValueError('lat/lon are missing or not numbers')
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError(f'position {lat}, {lon} is out of range')
+
+    id = record.get('id') or str(uuid.uuid4())
+    return Waypoint(str(id), name, planet, lat, lon)
+
+
+def is_duplicate(repository: WaypointRepository, waypoint: Waypoint) -> bool:
+    """
+    @return: whether repository has a waypoint with the same id or the same name on the same planet
+    """
+    if repository.get(waypoint.id) is not None:
+        return True
+    return any(other.planet == waypoint.planet for other in repository.by_name(waypoint.name))
+
+
+def read_waypoints(path: str) -> Iterator[tuple[int, Waypoint or str]]:
+    """
+    @return: (row, waypoint or why the row is invalid) for every record in path, row 0 if the file as a whole is broken
+    """
+    read, _ = _format(path)
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        try:
+            for row, record in read(f):
+                if isinstance(record, Exception):
+                    yield row, str(record)
+                    continue
+
+                try:
+                    yield row, _to_waypoint(record)
+                except ValueError as e:
+                    yield row, str(e)
+        except (ValueError, csv.Error) as e:
+            yield 0, str(e)
+
+
+def import_waypoints(path: str, repository: WaypointRepository) -> ImportReport:
+    """
+    Adds the waypoints in path to repository, skipping duplicates (see is_duplicate)
+    """
+    report = ImportReport()
+    for row, waypoint in read_waypoints(path):
+        if isinstance(waypoint, str):
+            report.error(row, waypoint)
+        elif is_duplicate(repository, waypoint):
+            report.duplicates += 1
+        else:
+            repository.add(waypoint)
+            report.added += 1
+
+    return report
+
+
+def export_waypoints(path: str, waypoints: Iterable[Waypoint]) -> int:
+    """
+    @return: number of waypoints written
+    """
+    _, write = _format(path)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8', newline='') as f:
+        n = write(f, waypoints)
+    os.replace(tmp, path)
+    return n
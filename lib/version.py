@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+Background check for a newer version
+
+The answer (the latest version published) is kept in .data/version.json for
+VERSION_CHECK_TTL, so most starts don't touch the network at all. Failed
+checks are not cached, the next start tries again.
+
+@author Kami-Kaze
+"""
+
+import json
+import threading
+import time
+import urllib.request
+
+from lib.globals import *
+
+# how long a check is good for (s)
+VERSION_CHECK_TTL = 12 * 60 * 60
+# give up on the request after this long (s)
+VERSION_CHECK_TIMEOUT = 5.0
+
+
+def parse_version(text: str) -> tuple[int, ...]:
+    """
+    @return: version text (e.g. '1.2.3') as comparable tuple, () if it isn't one
+    """
+    try:
+        return tuple(int(part) for part in text.strip().lstrip('v').split('.'))
+    except ValueError:
+        return ()
+
+
+class VersionCheck:
+    """
+    Fetches the latest version on a background thread, latest is set once it's known
+    and newer than current, done tells whether the check finished
+    """
+
+    def __init__(self, current: str, url: str = VERSION_REF_URL, cache_path: str = VERSION_CACHE_FILE,
+                 ttl: float = VERSION_CHECK_TTL, timeout: float = VERSION_CHECK_TIMEOUT):
+        self.current = current.strip()
+        self.url = url
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.timeout = timeout
+
+        # newer version available, None if there is none (or we don't know yet)
+        self.latest: str or None = None
+        self.done = threading.Event()
+        self._thread: threading.Thread or None = None
+
+    def start(self):
+        """
+        Uses the cached answer if it's recent enough, asks url in the background otherwise
+        """
+        if (cached := self._load_cache()) is not None:
+            self._set(cached)
+            self.done.set()
+            return
+
+        self._thread = threading.Thread(target=self._check, name='VersionCheck', daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        @return: whether the check finished within timeout
+        """
+        return self.done.wait(timeout)
+
+    def _check(self):
+        try:
+            with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+                latest = response.read().decode('utf-8').strip()
+            self._set(latest)
+            self._save_cache(latest)
+        except (OSError, ValueError) as e:
+            LOGGER.warning(f'Version check failed: {e}')
+        finally:
+            self.done.set()
+
+    def _set(self, latest: str):
+        if parse_version(self.current) < parse_version(latest):
+            self.latest = latest
+
+    def _load_cache(self) -> str or None:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if time.time() - cache['checked'] < self.ttl and cache['url'] == self.url:
+                return cache['latest']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def _save_cache(self, latest: str):
+        try:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump({'checked': time.time(), 'url': self.url, 'latest': latest}, f)
+        except OSError as e:
+            LOGGER.warning(f'Failed to cache version check: {e}')
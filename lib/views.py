@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+@author Kami-Kaze
+"""
+
+import threading
+
+from lib.waypoint import Measurements, Waypoint
+
+
+def by_name(waypoint: Waypoint) -> str:
+    return waypoint.name
+
+
+class WaypointViews:
+    """
+    Filtered waypoints, sorted and grouped by planet for the waypoint list.
+
+    Views are only rebuilt after the filtered waypoints changed (set)
+    or, when sorting by distance, new measurements came in, not every frame.
+    """
+
+    def __init__(self):
+        # filtered waypoints sorted by name (or distance)
+        self.sorted: list[Waypoint] = []
+        # (planet, waypoints sorted by name) sorted by planet
+        self.groups: list[tuple[str, list[Waypoint]]] = []
+        # groups flattened into rows: a planet (tree node) followed by its waypoints if it is open
+        self.rows: list[str or Waypoint] = []
+        self.open_planets: set[str] = set()
+
+        self._filtered: list[Waypoint] = []
+        self._dirty = True
+        self._rows_dirty = True
+        self._measurements: Measurements or None = None
+        self._lock = threading.Lock()
+
+    def set(self, filtered: list[Waypoint]):
+        with self._lock:
+            self._filtered = filtered
+            self._dirty = True
+
+    def set_open(self, planet: str, open: bool):
+        if open != (planet in self.open_planets):
+            if open:
+                self.open_planets.add(planet)
+            else:
+                self.open_planets.discard(planet)
+            self._rows_dirty = True
+
+    def refresh(self, measurements: Measurements or None = None):
+        """
+        Rebuilds the views if needed
+
+        @param measurements: sort by distance, waypoints not measured go last, None to sort by name
+        """
+        if not self._dirty and measurements is self._measurements:
+            if self._rows_dirty:
+                self._build_rows()
+            return
+
+        with self._lock:
+            filtered, dirty = self._filtered, self._dirty
+            self._dirty = False
+
+        if dirty:
+            groups = {}
+            for waypoint in filtered:
+                groups.setdefault(waypoint.planet, []).append(waypoint)
+            for waypoints in groups.values():
+                waypoints.sort(key=by_name)
+            self.groups = sorted(groups.items())
+            self._build_rows()
+
+        if measurements is None:
+            self.sorted = sorted(filtered, key=by_name)
+        else:
+            def key(waypoint: Waypoint):
+                if (measured := measurements.get(waypoint)) is None:
+                    return True, 0.0, waypoint.name
+                return False, measured[0], waypoint.name
+
+            self.sorted = sorted(filtered, key=key)
+
+        self._measurements = measurements
+
+    def _build_rows(self):
+        rows = []
+        for planet, waypoints in self.groups:
+            rows.append(planet)
+            if planet in self.open_planets:
+                rows.extend(waypoints)
+        self.rows = rows
+        self._rows_dirty = False
@@ -5,8 +5,12 @@
 @author Kami-Kaze
 """
 import math
+import threading
 import uuid
 from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
 
 
 @dataclass
@@ -86,3 +90,130 @@ def calculate_distance(position: tuple[float, float], target: tuple[float, float
     a = math.sin(d_lat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(d_lon / 2) ** 2
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     return c * planet_radius
+
+
+def calculate_destination(position: tuple[float, float], bearing: float, distance: float, planet_radius) -> tuple[float, float]:
+    """
+    Inverse of calculate_bearing/calculate_distance
+
+    @param bearing: initial bearing in °
+    @param distance: distance to travel on the great circle in meters
+    @return: (lat, long) reached
+    """
+    lat1, lon1 = radians(*position)
+    theta = math.radians(bearing)
+    delta = distance / planet_radius
+
+    sin_lat2 = math.sin(lat1) * math.cos(delta) + math.cos(lat1) * math.sin(delta) * math.cos(theta)
+    lat2 = math.asin(max(min(sin_lat2, 1.0), -1.0))
+    lon2 = lon1 + math.atan2(
+            math.sin(theta) * math.sin(delta) * math.cos(lat1),
+            math.cos(delta) - math.sin(lat1) * sin_lat2
+    )
+
+    # normalize to -180..180
+    return math.degrees(lat2), (math.degrees(lon2) + 540) % 360 - 180
+
+
+def calculate_distances(position: tuple[float, float], lat: np.ndarray, lon: np.ndarray, planet_radius) -> np.ndarray:
+    """
+    Batched calculate_distance
+
+    @param lat: target latitudes in °
+    @param lon: target longitudes in °
+    @return: distance on surface from position to each target in meters
+    """
+    lat1, lon1 = radians(*position)
+    lat2 = np.radians(lat)
+    d_lat, d_lon = lat2 - lat1, np.radians(lon) - lon1
+
+    a = np.sin(d_lat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(d_lon / 2) ** 2
+    # clip against rounding, sqrt(1 - a) would be nan otherwise
+    np.clip(a, 0.0, 1.0, out=a)
+    return 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a)) * planet_radius
+
+
+class Measurements(NamedTuple):
+    # waypoint id -> index into the arrays below
+    index: dict[str, int]
+    distance: np.ndarray
+    bearing: np.ndarray
+    # s, nan if we are not moving
+    eta: np.ndarray
+
+    def get(self, waypoint: Waypoint) -> tuple[float, float, float] or None:
+        """
+        @return: (distance, bearing, eta) to waypoint, None if it was not measured
+        """
+        if (i := self.index.get(waypoint.id)) is None:
+            return None
+        return float(self.distance[i]), float(self.bearing[i]), float(self.eta[i])
+
+
+class WaypointMeter:
+    """
+    Measures distance, bearing and ETA to every waypoint of a planet in one go.
+
+    Coordinates are kept in arrays which are rebuilt lazily after invalidate(),
+    so call it whenever waypoints are added, edited or deleted.
+    """
+
+    def __init__(self, waypoints):
+        """
+        @param waypoints: WaypointRepository to measure the waypoints of
+        """
+        self.waypoints = waypoints
+        self.measurements: Measurements or None = None
+
+        self._planet: str or None = None
+        self._index: dict[str, int] = {}
+        # longitude (rad) and sin/cos of the latitude, they don't depend on our position
+        self._lon = np.empty(0)
+        self._sin_lat = np.empty(0)
+        self._cos_lat = np.empty(0)
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._planet = None
+
+    def measure(self, planet: str, position: tuple[float, float], planet_radius: float, velocity: float or None) -> Measurements:
+        """
+        @param planet_radius: radius to measure at, i.e. planet radius + altitude
+        @param velocity: current velocity in m/s, None if unknown
+        """
+        with self._lock:
+            if planet != self._planet:
+                waypoints = self.waypoints.on_planet(planet)
+                lat = np.radians(np.fromiter((waypoint.lat for waypoint in waypoints), float, len(waypoints)))
+                self._index = {waypoint.id: i for i, waypoint in enumerate(waypoints)}
+                self._lon = np.radians(np.fromiter((waypoint.lon for waypoint in waypoints), float, len(waypoints)))
+                self._sin_lat = np.sin(lat)
+                self._cos_lat = np.cos(lat)
+                self._planet = planet
+
+            index, lon, sin_lat2, cos_lat2 = self._index, self._lon, self._sin_lat, self._cos_lat
+
+        lat1, lon1 = radians(*position)
+        sin_lat1, cos_lat1 = math.sin(lat1), math.cos(lat1)
+        d_lon = lon - lon1
+        sin_d_lon, cos_d_lon = np.sin(d_lon), np.cos(d_lon)
+
+        # bearing as in calculate_bearing, batched, its terms also give the distance (vincenty's formula)
+        y = cos_lat2 * sin_d_lon
+        x = cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * cos_d_lon
+        bearing = np.degrees(np.arctan2(y, x))
+        np.mod(bearing + 360, 360, out=bearing)
+        distance = np.arctan2(np.hypot(y, x), sin_lat1 * sin_lat2 + cos_lat1 * cos_lat2 * cos_d_lon)
+        distance *= planet_radius
+
+        if velocity is not None and 0.0 < velocity:
+            eta = distance / velocity
+        else:
+            eta = np.full_like(distance, np.nan)
+
+        self.measurements = Measurements(index, distance, bearing, eta)
+        return self.measurements
+
+    def clear(self):
+        self.measurements = None
@@ -10,6 +10,8 @@ see https://stackoverflow.com/a/11910555/10330869
 """
 
 import ctypes
+from ctypes import wintypes
+from typing import Callable
 
 import win32api
 import win32gui
@@ -355,13 +357,37 @@ def scan_code(key):
     return win32api.MapVirtualKey(key, 0)
 
 
-def press_key(key, *mods):
+def compile_keys(key, *mods):
+    """
+    @return: ready to send INPUT array pressing key while holding mods, see send_compiled
+    """
     inputs = [
         *[Keyboard(mod) for mod in mods],
         Keyboard(key), Keyboard(key, KEYEVENTF_KEYUP),
         *[Keyboard(mod, KEYEVENTF_KEYUP) for mod in reversed(mods)],
     ]
-    return SendInput(*inputs)
+    return (_INPUT * len(inputs))(*inputs)
+
+
+def send_compiled(*compiled):
+    """
+    Sends one or more arrays from compile_keys in a single SendInput call
+    """
+    if len(compiled) == 1:
+        pInputs = compiled[0]
+    else:
+        pInputs = (_INPUT * sum(len(c) for c in compiled))()
+        offset = 0
+        for c in compiled:
+            ctypes.memmove(ctypes.byref(pInputs, offset), c, ctypes.sizeof(c))
+            offset += ctypes.sizeof(c)
+
+    cbSize = ctypes.c_int(ctypes.sizeof(_INPUT))
+    return ctypes.windll.user32.SendInput(len(pInputs), pInputs, cbSize)
+
+
+def press_key(key, *mods):
+    return send_compiled(compile_keys(key, *mods))
 
 
 def stream_chars(string):
@@ -406,3 +432,96 @@ def get_active_window() -> W_HNDL:
 
 def is_window_focused(hndl: W_HNDL) -> bool:
     return False if hndl is None else hndl == get_active_window()
+
+
+def get_window_text(hndl: W_HNDL) -> str:
+    return '' if hndl is None else win32gui.GetWindowText(hndl)
+
+
+############################################################################################################
+#
+# Window events
+#
+############################################################################################################
+
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_OBJECT_DESTROY = 0x8001
+OBJID_WINDOW = 0
+WINEVENT_OUTOFCONTEXT = 0x0000
+WM_QUIT = 0x0012
+# posted to the event thread by watch_window, wParam is the window handle
+WM_WATCH_WINDOW = 0x8000 + 1
+
+HWINEVENTHOOK = wintypes.HANDLE
+WinEventProc = ctypes.WINFUNCTYPE(None, HWINEVENTHOOK, DWORD, wintypes.HWND, LONG, LONG, DWORD, DWORD)
+
+# handles are pointer sized, without prototypes ctypes would truncate them to an int
+_user32 = ctypes.windll.user32
+_user32.SetWinEventHook.argtypes = (DWORD, DWORD, wintypes.HMODULE, WinEventProc, DWORD, DWORD, DWORD)
+_user32.SetWinEventHook.restype = HWINEVENTHOOK
+_user32.UnhookWinEvent.argtypes = (HWINEVENTHOOK,)
+_user32.UnhookWinEvent.restype = wintypes.BOOL
+_user32.GetWindowThreadProcessId.argtypes = (wintypes.HWND, ctypes.POINTER(DWORD))
+_user32.GetWindowThreadProcessId.restype = DWORD
+_user32.IsWindow.argtypes = (wintypes.HWND,)
+_user32.IsWindow.restype = wintypes.BOOL
+_user32.PostThreadMessageW.argtypes = (DWORD, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
+_user32.PostThreadMessageW.restype = wintypes.BOOL
+
+
+def run_window_events(callback: Callable[[int, W_HNDL], None], ready: Callable[[int], None]):
+    """
+    Hooks foreground events of all windows and destroy events of the window passed to
+    watch_window, and pumps messages on the calling thread until stop_window_events is called
+
+    @param callback: called with (event, window handle) for every event
+    @param ready: called with the thread id once the hooks are in place
+    """
+    def on_event(hook, event, hndl, id_object, id_child, thread, time):
+        # we only care about windows, not their children (caret, scrollbars, ...)
+        if id_object == OBJID_WINDOW and id_child == 0:
+            callback(event, _make_hndl(hndl or 0))
+
+    # keep a reference, the hook must not outlive the callback
+    proc = WinEventProc(on_event)
+    foreground = _user32.SetWinEventHook(EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, None, proc, 0, 0, WINEVENT_OUTOFCONTEXT)
+    # every menu, caret and tooltip on the desktop fires a destroy event, only hook the watched window's process
+    destroy = None
+
+    try:
+        ready(ctypes.windll.kernel32.GetCurrentThreadId())
+        msg = wintypes.MSG()
+        while _user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            if not msg.hWnd and msg.message == WM_WATCH_WINDOW:
+                if destroy:
+                    _user32.UnhookWinEvent(destroy)
+                    destroy = None
+
+                hndl = msg.wParam
+                process = DWORD()
+                if hndl and _user32.GetWindowThreadProcessId(hndl, ctypes.byref(process)):
+                    destroy = _user32.SetWinEventHook(EVENT_OBJECT_DESTROY, EVENT_OBJECT_DESTROY, None, proc, process.value, 0,
+                                                      WINEVENT_OUTOFCONTEXT)
+                # it might have been destroyed before the hook was in place
+                if hndl and not _user32.IsWindow(hndl):
+                    callback(EVENT_OBJECT_DESTROY, hndl)
+                continue
+
+            _user32.TranslateMessage(ctypes.byref(msg))
+            _user32.DispatchMessageW(ctypes.byref(msg))
+    finally:
+        for hook in (foreground, destroy):
+            if hook:
+                _user32.UnhookWinEvent(hook)
+
+
+def watch_window(thread_id: int, hndl: W_HNDL):
+    """
+    Makes the run_window_events loop on thread_id report the destruction of hndl (only),
+    None stops watching
+    """
+    _user32.PostThreadMessageW(thread_id, WM_WATCH_WINDOW, hndl or 0, 0)
+
+
+def stop_window_events(thread_id: int):
+    _user32.PostThreadMessageW(thread_id, WM_QUIT, 0, 0)
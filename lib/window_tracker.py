@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+@author Kami-Kaze
+"""
+
+import threading
+from typing import Callable
+
+from lib.globals import *
+
+
+class WindowTracker:
+    """
+    Caches the handle of a window and keeps track of whether it's focused.
+
+    Nothing is polled: after an initial lookup, windows pushes foreground events and the
+    destruction of the tracked window to a background thread (see win.run_window_events),
+    so reading `hndl`, `running` or `focused` costs nothing.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hndl: win.W_HNDL = None
+        self.focused = False
+
+        self._listeners: list[Callable[[bool], None]] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread or None = None
+        self._thread_id: int or None = None
+
+    @property
+    def running(self) -> bool:
+        return self.hndl is not None
+
+    def add_listener(self, on_focus_change: Callable[[bool], None]):
+        """
+        @param on_focus_change: called with the new focus state, from the tracker thread
+        """
+        self._listeners.append(on_focus_change)
+
+    def start(self):
+        ready = threading.Event()
+
+        def on_ready(thread_id: int):
+            self._thread_id = thread_id
+            ready.set()
+
+        self._thread = threading.Thread(target=win.run_window_events, args=(self._on_event, on_ready), name='WindowTracker', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+        # hooks are in place, anything after this lookup will be pushed to us
+        with self._lock:
+            self._set_hndl(win.find_window(self.name))
+            self._set_focused(win.is_window_focused(self.hndl))
+
+    def stop(self):
+        if self._thread is None:
+            return
+
+        win.stop_window_events(self._thread_id)
+        self._thread.join()
+        self._thread = None
+        self._thread_id = None
+
+    def _on_event(self, event: int, hndl: win.W_HNDL):
+        with self._lock:
+            if event == win.EVENT_SYSTEM_FOREGROUND:
+                # game (re-)started, it pops up in the foreground
+                if self.hndl is None and hndl is not None and win.get_window_text(hndl) == self.name:
+                    self._set_hndl(hndl)
+                self._set_focused(hndl is not None and hndl == self.hndl)
+
+            elif event == win.EVENT_OBJECT_DESTROY and hndl is not None and hndl == self.hndl:
+                self._set_hndl(None)
+                self._set_focused(False)
+
+    def _set_hndl(self, hndl: win.W_HNDL):
+        self.hndl = hndl
+        # destroy events are only hooked for the tracked window
+        win.watch_window(self._thread_id, hndl)
+
+    def _set_focused(self, focused: bool):
+        if focused == self.focused:
+            return
+
+        self.focused = focused
+        for listener in self._listeners:
+            listener(focused)